@@ -0,0 +1,64 @@
+"""
+
+    Implements batched probability diffusion from many starting nodes over the same network.
+
+    Function DIFFUSE_PROB_BATCH takes either a list of (sn, p1) pairs or a matrix of starting distributions with one
+    row per source and returns a NumPy array with one row of node probabilities per source. Every row is equal to the
+    result of a separate DIFFUSE_PROB_ITERATIVE call. Sources share the neighbour lists and normalized edge weights
+    cached by the DiffusionGraph, and sources with the same starting nodes and probabilities are diffused once, but
+    traversals of different sources are independent. Each source only reads and writes the nodes its diffusion
+    reaches, so a batch costs the same as calling DIFFUSE_PROB_ITERATIVE for every source. Passing dtype=np.float32 halves the memory of the returned array, every row
+    is still summed in double precision.
+
+"""
+from collections import defaultdict
+
+import numpy as np
+import scipy.sparse as sp
+
+from src.algorithm.ctd import THRESHOLD_DIFF, _diffuse_iterative, _write_back
+from src.algorithm.graph import as_diffusion_graph
+
+
+def DIFFUSE_PROB_BATCH(sources, adj_mat, alpha=0.5, threshold=THRESHOLD_DIFF, dtype=np.float64):
+    graph = as_diffusion_graph(adj_mat)
+    distributions, starts = _read_sources(sources, graph.node_count, dtype)
+
+    # Rows with the same starts also had the same starting distribution, so their results are equal
+    diffused = {}
+    for source, source_starts in enumerate(starts):
+        key = tuple(source_starts)
+        if key in diffused:
+            distributions[source] = distributions[diffused[key]]
+            continue
+        diffused[key] = source
+        _diffuse_row(distributions[source], source_starts, graph, alpha, threshold)
+
+    return distributions
+
+
+def _diffuse_row(row, source_starts, graph, alpha, threshold):
+    # Row is 0 everywhere except on its starting nodes
+    buffer = defaultdict(float, {sn: float(row[sn]) for sn, _ in source_starts})
+    for sn, p1 in source_starts:
+        _diffuse_iterative(p1, sn, buffer, graph, alpha, threshold)
+    _write_back(row, buffer)
+
+
+def _read_sources(sources, node_count, dtype=np.float64):
+    if sp.issparse(sources):
+        sources = sources.toarray()
+
+    if isinstance(sources, np.ndarray) and sources.ndim == 2:
+        if sources.shape[1] != node_count:
+            raise ValueError(f"Starting distributions have {sources.shape[1]} columns, graph has {node_count} nodes")
+        distributions = np.array(sources, dtype=dtype)
+        starts = [[(sn, distribution[sn]) for sn in np.flatnonzero(distribution).tolist()]
+                  for distribution in distributions.tolist()]
+        return distributions, starts
+
+    starts = [[(int(sn), p1)] for sn, p1 in sources]
+    distributions = np.zeros((len(starts), node_count), dtype=dtype)
+    for source, ((sn, p1),) in enumerate(starts):
+        distributions[source, sn] = p1
+    return distributions, starts
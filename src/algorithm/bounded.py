@@ -0,0 +1,98 @@
+"""
+
+    Implements probability diffusion with a bounded amount of work.
+
+    Function DIFFUSE_PROB_BOUNDED expands the frontier state holding the most probability first and stops as soon as
+    one of the given budgets is used up: number of expansions, estimated memory held by the frontier in bytes or
+    time in seconds. Probability of states left in the frontier stays on their nodes, same as for branches pruned by
+    threshold, and its total is returned as unexpanded_probability. Results differ from the exact diffusion by
+    at most 2 * unexpanded_probability in L1 norm. Without budgets the same states are expanded as in
+    DIFFUSE_PROB_ITERATIVE, only in a different order.
+
+"""
+import heapq
+import sys
+import time
+from collections import namedtuple
+from itertools import count
+
+from src.algorithm.ctd import THRESHOLD_DIFF, _buffer, _write_back
+from src.algorithm.graph import as_diffusion_graph
+
+BoundedDiffusion = namedtuple("BoundedDiffusion", ["expansions", "unexpanded_probability", "stopped_by"])
+
+# Approximate size of one frontier entry: heap tuple, probability, counter and link of the visited path
+FRONTIER_ENTRY_SIZE = sys.getsizeof((0.0, 0, (0, None))) + sys.getsizeof(0.0) + sys.getsizeof(2 ** 40) + \
+                      sys.getsizeof((0, None))
+
+
+def DIFFUSE_PROB_BOUNDED(p1, sn, G, adj_mat, alpha=0.5, threshold=THRESHOLD_DIFF, max_expansions=None, max_memory=None,
+                         time_limit=None):
+    graph = as_diffusion_graph(adj_mat)
+    row = graph.row
+    buffer = _buffer(G)
+    deadline = None if time_limit is None else time.monotonic() + time_limit
+    max_frontier = None if max_memory is None else max_memory // FRONTIER_ENTRY_SIZE
+
+    # Probabilities are negated, so the state with the most probability is on top of the heap
+    tie_breaker = count()
+    frontier = [(-p1, next(tie_breaker), (sn, None))]
+    expansions = 0
+    stopped_by = None
+
+    while len(frontier) > 0:
+        # Starting node is always expanded, its probability was never taken from G[sn] so it can not stay there
+        if expansions > 0:
+            if max_expansions is not None and expansions >= max_expansions:
+                stopped_by = "expansions"
+                break
+            if max_frontier is not None and len(frontier) > max_frontier:
+                stopped_by = "memory"
+                break
+            if deadline is not None and time.monotonic() >= deadline:
+                stopped_by = "time"
+                break
+
+        negative_probability, _, path = heapq.heappop(frontier)
+        current_probability = -negative_probability
+        current_node = path[0]
+        vN = set()
+        link = path
+        while link is not None:
+            vN.add(link[0])
+            link = link[1]
+        expansions += 1
+
+        neighbours, weights, _ = row(current_node)
+        UNsn = [(node, weight) for node, weight in zip(neighbours, weights) if node not in vN]
+
+        if len(UNsn) == 0:
+            if len(vN) == graph.node_count:
+                continue
+            to_add = current_probability / (graph.node_count - len(vN))
+            for node in range(graph.node_count):
+                if node not in vN:
+                    buffer[node] += to_add
+            continue
+
+        if len(UNsn) == len(neighbours):
+            children = zip(neighbours, graph.fractions(current_node))
+        else:
+            sum_weights = 0
+            for _, weight in UNsn:
+                sum_weights += weight
+            children = [(node, weight / sum_weights) for node, weight in UNsn]
+        for node, fraction in children:
+            inherited_prob = current_probability * fraction
+            buffer[node] += inherited_prob
+            if inherited_prob * alpha > threshold and any(x not in vN for x in row(node)[0]):
+                buffer[node] -= inherited_prob * alpha
+                heapq.heappush(frontier, (-(inherited_prob * alpha), next(tie_breaker), (node, path)))
+
+    unexpanded_probability = 0
+    for negative_probability, _, path in frontier:
+        buffer[path[0]] -= negative_probability
+        unexpanded_probability -= negative_probability
+    _write_back(G, buffer)
+
+    return BoundedDiffusion(expansions, unexpanded_probability, stopped_by)
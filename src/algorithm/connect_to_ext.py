@@ -0,0 +1,87 @@
+"""
+
+    Implements connecting a node to its unvisited extended neighbours, Python counterpart of
+    src/R/graph.connectToExt.r.
+
+    When every neighbour of the starting node has already been visited, visited nodes (except the starting node)
+    are removed from the graph and the starting node is connected to each unvisited neighbour of its neighbours (its
+    extended neighbours). The new edge gets the weight of the edge between the extended neighbour and the starting
+    node's neighbour with the highest index, same as the last matching neighbour in the R loops.
+
+    Unlike the R function, which copies the whole matrix and drops rows and columns of removed nodes, the result
+    keeps every node index, removed nodes are left without edges. The new CSR arrays are built in one pass with
+    array operations: edges of removed nodes are masked out and edges to the extended neighbours are added, so the
+    cost is linear in the number of edges however many nodes are removed.
+
+    Example (graph from the R documentation):
+        A - B 2, A - C 1, B - C 1, C - D 1, D - E 2, E - F 2, E - G 1, F - G 1
+        CONNECT_TO_EXT(graph, A, [B, C]) removes B and C and adds edge A - D with weight 1 (weight of C - D).
+
+"""
+import numpy as np
+import scipy.sparse as sp
+
+from src.algorithm.graph import DiffusionGraph, as_diffusion_graph
+
+
+def CONNECT_TO_EXT(adj_mat, sn, visited_nodes, in_place=False):
+    """
+        Returns graph in which sn is connected to its unvisited extended neighbours, or the graph itself if sn has
+        an unvisited neighbour or no node other than sn was visited. Unless in_place is set, changes are made on a
+        new DiffusionGraph sharing the CSR arrays of the given graph, which stays unchanged.
+    """
+    graph = as_diffusion_graph(adj_mat)
+    indptr, indices, weights = graph.csr_arrays()
+
+    removed = set(visited_nodes)
+    removed.discard(sn)
+    neighbours = indices[indptr[sn]:indptr[sn + 1]]
+    neighbours = neighbours[neighbours != sn]
+    if len(removed) == 0 or any(node not in removed for node in neighbours.tolist()):
+        return graph
+
+    ext_nodes, ext_weights = extended_neighbours(indptr, indices, weights, sn, removed)
+
+    is_removed = np.zeros(graph.node_count, dtype=bool)
+    is_removed[list(removed)] = True
+    rows = np.repeat(np.arange(graph.node_count), np.diff(indptr))
+    keep = ~(is_removed[rows] | is_removed[indices])
+    # Extended neighbours are not neighbours of sn, so the added edges are new in both directions
+    starts = np.full(len(ext_nodes), sn, dtype=rows.dtype)
+    matrix = sp.csr_matrix((np.concatenate((weights[keep], ext_weights, ext_weights)),
+                            (np.concatenate((rows[keep], starts, ext_nodes)),
+                             np.concatenate((indices[keep], ext_nodes, starts)))),
+                           shape=(graph.node_count, graph.node_count))
+    matrix.sort_indices()
+
+    if not in_place:
+        return DiffusionGraph(matrix.indptr, matrix.indices, matrix.data)
+    graph.set_csr_arrays(matrix.indptr, matrix.indices, matrix.data)
+    return graph
+
+
+def extended_neighbours(indptr, indices, weights, sn, removed=()):
+    """
+        Returns nodes which are not neighbours of sn but are neighbours of its neighbours, leaving out sn and removed
+        nodes, and the weight each of them is connected with. A node connected to several neighbours of sn gets the
+        weight of its edge to the neighbour with the highest index.
+    """
+    start, end = indptr[sn], indptr[sn + 1]
+    connected = indices[start:end]
+
+    # Positions of all neighbours of neighbours in CSR arrays, grouped by neighbour in ascending order
+    counts = indptr[connected + 1] - indptr[connected]
+    offsets = np.cumsum(counts) - counts
+    positions = np.arange(counts.sum()) - np.repeat(offsets, counts) + np.repeat(indptr[connected], counts)
+    nodes = indices[positions]
+    node_weights = weights[positions]
+
+    # Last position of every node is its edge to the neighbour with the highest index
+    last = np.full(len(indptr) - 1, -1, dtype=np.int64)
+    np.maximum.at(last, nodes, np.arange(len(nodes)))
+
+    last[connected] = -1
+    last[sn] = -1
+    last[np.fromiter(removed, dtype=np.int64, count=len(removed))] = -1
+    ext_nodes = np.flatnonzero(last >= 0)
+    return ext_nodes.astype(indices.dtype), node_weights[last[ext_nodes]]
@@ -2,60 +2,296 @@
 
     Implements probability diffusion algorithm in both recursive and iterative form.
 
+    DIFFUSE_PROB_DEPTH_FIRST follows the same order of visits and additions as DIFFUSE_PROB_RECURSIVE, so its results
+    are equal bit for bit, but keeps the nodes being expanded on an explicit stack and the visited nodes in one set
+    shared by the whole traversal. It is not limited by the recursion limit, so it can follow paths tens of
+    thousands of nodes long.
+
+    Adjacency matrix can be given as a pandas DataFrame, a scipy.sparse matrix, a NumPy array, an edge list or a
+    DiffusionGraph (see src/algorithm/graph.py). Passing the same DiffusionGraph to many calls reuses its cached
+    neighbour lists, so each call only pays for the part of the graph it traverses. Probabilities are accumulated in
+    G, which has to hold an entry for every node of the graph, and G is returned. G can be a list, a dict or a NumPy
+    array of any float type (see src/algorithm/result.py). For an array, only the nodes diffusion reaches are read
+    into a dict of Python floats, summed there and written back with one assignment at the end, so a call costs the
+    same for any graph size and float32 arrays are summed in double precision and stored in single precision.
+
+    Diffusion stops sending probability further when the amount sent would be threshold or less, THRESHOLD_DIFF by
+    default.
+
+    Passing a DiffusionStats instance (see src/algorithm/stats.py) as stats collects counters and timings of the run.
+
 """
+from collections import deque
+
+import numpy as np
+
+from src.algorithm.graph import as_diffusion_graph
+
 THRESHOLD_DIFF = 0.01
 
 
-def DIFFUSE_PROB_RECURSIVE(p1, sn, G, vN, adj_mat, alpha=0.5):
-    u_vN = G.keys() - vN
-    UNsn = set(filter(lambda x: adj_mat.iloc[sn, x] > 0, u_vN))
+class _TouchedNodes(dict):
+    """
+        Probabilities of the nodes of array G reached by diffusion. A node starts from its value in G the first time
+        it is reached, so values are summed in the same order as when adding to G directly.
+    """
+
+    def __init__(self, G):
+        super().__init__()
+        self.G = G
+
+    def __missing__(self, node):
+        return float(self.G[node])
+
+
+def _buffer(G):
+    # Adding to items of a NumPy array one at a time is much slower than adding to Python floats
+    return _TouchedNodes(G) if isinstance(G, np.ndarray) else G
+
+
+def _write_back(G, buffer):
+    if buffer is not G and len(buffer) > 0:
+        nodes = np.fromiter(buffer.keys(), dtype=np.int64, count=len(buffer))
+        G[nodes] = np.fromiter(buffer.values(), dtype=np.float64, count=len(buffer))
+    return G
+
+
+def DIFFUSE_PROB_RECURSIVE(p1, sn, G, vN, adj_mat, alpha=0.5, threshold=THRESHOLD_DIFF, stats=None):
+    buffer = _buffer(G)
+    if stats is None:
+        _diffuse_recursive(p1, sn, buffer, vN, as_diffusion_graph(adj_mat), alpha, threshold)
+        return _write_back(G, buffer)
+
+    with stats.phase("graph"):
+        graph = as_diffusion_graph(adj_mat)
+    with stats.phase("diffusion"):
+        _diffuse_recursive(p1, sn, buffer, vN, graph, alpha, threshold, stats)
+    return _write_back(G, buffer)
+
+
+def _diffuse_recursive(p1, sn, G, vN, graph, alpha, threshold, stats=None, depth=0):
+    if stats is not None:
+        stats.record_expansion(depth, 0)
+    row = graph.row
+    neighbours, weights, weight_sum = row(sn)
+    UNsn = [(node, weight) for node, weight in zip(neighbours, weights) if node not in vN]
 
     if len(UNsn) == 0:
-        if len(u_vN) == 0:
+        if len(vN) == graph.node_count:
             return
-        probability_for_all = p1 / len(u_vN)
-        for node in u_vN:
-            G[node] += probability_for_all
+        if stats is not None:
+            stats.record_uniform_spread(p1)
+        probability_for_all = p1 / (graph.node_count - len(vN))
+        for node in range(graph.node_count):
+            if node not in vN:
+                G[node] += probability_for_all
         return
 
-    sum_weights = 0
-    for node in UNsn:
-        sum_weights += adj_mat.iloc[sn, node]
+    if len(UNsn) == len(neighbours):
+        sum_weights = weight_sum
+    else:
+        sum_weights = 0
+        for _, weight in UNsn:
+            sum_weights += weight
 
     multiplier = p1 / sum_weights
-    for node in UNsn:
-        inherited_prob = multiplier * adj_mat.iloc[sn, node]
+    if stats is not None:
+        stats.pruned += sum(1 for _, weight in UNsn if multiplier * weight * alpha <= threshold)
+    for node, weight in UNsn:
+        inherited_prob = multiplier * weight
         G[node] += inherited_prob
-        if inherited_prob * alpha > THRESHOLD_DIFF and len(
-                set(filter(lambda x: adj_mat.iloc[node, x] > 0, u_vN))) > 0:
+        if inherited_prob * alpha > threshold and any(x not in vN for x in row(node)[0]):
             G[node] -= inherited_prob * alpha
-            DIFFUSE_PROB_RECURSIVE(inherited_prob * alpha, node, G, vN.union({node}), adj_mat)
+            _diffuse_recursive(inherited_prob * alpha, node, G, vN.union({node}), graph, alpha, threshold, stats,
+                               depth + 1)
+
 
+def DIFFUSE_PROB_DEPTH_FIRST(p1, sn, G, vN, adj_mat, alpha=0.5, threshold=THRESHOLD_DIFF, stats=None):
+    buffer = _buffer(G)
+    if stats is None:
+        _diffuse_depth_first(p1, sn, buffer, vN, as_diffusion_graph(adj_mat), alpha, threshold)
+        return _write_back(G, buffer)
 
-def DIFFUSE_PROB_ITERATIVE(p1, sn, G, adj_mat, alpha=0.5):
-    queue = [(sn, p1, {sn})]
+    with stats.phase("graph"):
+        graph = as_diffusion_graph(adj_mat)
+    with stats.phase("diffusion"):
+        _diffuse_depth_first(p1, sn, buffer, vN, graph, alpha, threshold, stats)
+    return _write_back(G, buffer)
+
+
+def _diffuse_depth_first(p1, sn, G, vN, graph, alpha, threshold, stats=None):
+    row = graph.row
+    # Nodes on the current path, a node is added when it is expanded and removed when all its children are done
+    visited = set(vN)
+    # Every stack entry is a node being expanded, the multiplier of its row weights and its remaining children
+    stack = []
+    current_probability, current_node = p1, sn
+
+    while True:
+        if stats is not None:
+            stats.record_expansion(len(stack), 0)
+        neighbours, weights, weight_sum = row(current_node)
+        UNsn = [(node, weight) for node, weight in zip(neighbours, weights) if node not in visited]
+
+        if len(UNsn) == 0:
+            if len(visited) != graph.node_count:
+                if stats is not None:
+                    stats.record_uniform_spread(current_probability)
+                probability_for_all = current_probability / (graph.node_count - len(visited))
+                for node in range(graph.node_count):
+                    if node not in visited:
+                        G[node] += probability_for_all
+            if len(stack) > 0:
+                visited.discard(current_node)
+        else:
+            if len(UNsn) == len(neighbours):
+                sum_weights = weight_sum
+            else:
+                sum_weights = 0
+                for _, weight in UNsn:
+                    sum_weights += weight
+            multiplier = current_probability / sum_weights
+            if stats is not None:
+                stats.pruned += sum(1 for _, weight in UNsn if multiplier * weight * alpha <= threshold)
+            stack.append((current_node, multiplier, iter(UNsn)))
+
+        # Continue with the next child that sends probability further, going back up from finished nodes
+        current_node = None
+        while len(stack) > 0 and current_node is None:
+            parent, multiplier, children = stack[-1]
+            for node, weight in children:
+                inherited_prob = multiplier * weight
+                G[node] += inherited_prob
+                if inherited_prob * alpha > threshold and any(x not in visited for x in row(node)[0]):
+                    G[node] -= inherited_prob * alpha
+                    current_probability, current_node = inherited_prob * alpha, node
+                    break
+            else:
+                stack.pop()
+                if len(stack) > 0:
+                    visited.discard(parent)
+        if current_node is None:
+            return
+        visited.add(current_node)
+
+
+def DIFFUSE_PROB_ITERATIVE(p1, sn, G, adj_mat, alpha=0.5, threshold=THRESHOLD_DIFF, merge_states=False, stats=None):
+    diffuse = _diffuse_merged if merge_states else _diffuse_iterative
+    buffer = _buffer(G)
+    if stats is None:
+        diffuse(p1, sn, buffer, as_diffusion_graph(adj_mat), alpha, threshold)
+        return _write_back(G, buffer)
+
+    with stats.phase("graph"):
+        graph = as_diffusion_graph(adj_mat)
+    with stats.phase("diffusion"):
+        diffuse(p1, sn, buffer, graph, alpha, threshold, stats)
+    return _write_back(G, buffer)
+
+
+def _diffuse_iterative(p1, sn, G, graph, alpha, threshold, stats=None):
+    row = graph.row
+    # Queue entries hold the visited path as (node, parent path) links, so a child shares its parent's path
+    # instead of copying the whole visited set. The set is rebuilt once per expansion for O(1) membership tests.
+    queue = deque([(p1, (sn, None))])
 
     while len(queue) > 0:
-        current_node, current_probability, vN = queue.pop(0)
+        current_probability, path = queue.popleft()
+        current_node = path[0]
+        vN = set()
+        link = path
+        while link is not None:
+            vN.add(link[0])
+            link = link[1]
+        if stats is not None:
+            stats.record_expansion(len(vN) - 1, len(queue) + 1)
 
-        u_vN = G.keys() - vN
-        UNsn = set(filter(lambda x: adj_mat.iloc[current_node, x] > 0, u_vN))
+        neighbours, weights, _ = row(current_node)
+        UNsn = [(node, weight) for node, weight in zip(neighbours, weights) if node not in vN]
 
         if len(UNsn) == 0:
-            if len(u_vN) == 0:
+            if len(vN) == graph.node_count:
                 continue
-            to_add = current_probability / len(u_vN)
-            for node in u_vN:
-                G[node] += to_add
+            if stats is not None:
+                stats.record_uniform_spread(current_probability)
+            to_add = current_probability / (graph.node_count - len(vN))
+            for node in range(graph.node_count):
+                if node not in vN:
+                    G[node] += to_add
             continue
 
-        sum_weights = 0
-        for node in UNsn:
-            sum_weights += adj_mat.iloc[current_node, node]
-        for node in UNsn:
-            inherited_prob = current_probability * (adj_mat.iloc[current_node, node] / sum_weights)
+        if len(UNsn) == len(neighbours):
+            children = zip(neighbours, graph.fractions(current_node))
+        else:
+            sum_weights = 0
+            for _, weight in UNsn:
+                sum_weights += weight
+            children = [(node, weight / sum_weights) for node, weight in UNsn]
+        if stats is not None:
+            children = list(children)
+            stats.pruned += sum(1 for _, fraction in children if current_probability * fraction * alpha <= threshold)
+        for node, fraction in children:
+            inherited_prob = current_probability * fraction
             G[node] += inherited_prob
-            if inherited_prob * alpha > THRESHOLD_DIFF and len(
-                    set(filter(lambda x: adj_mat.iloc[node, x] > 0, u_vN))) > 0:
+            if inherited_prob * alpha > threshold and any(x not in vN for x in row(node)[0]):
                 G[node] -= inherited_prob * alpha
-                queue.append((node, inherited_prob * alpha, vN.union({node})))
+                queue.append((inherited_prob * alpha, (node, path)))
+
+
+def _diffuse_merged(p1, sn, G, graph, alpha, threshold, stats=None):
+    """
+        Iterative diffusion which expands all queue entries with the same current node and visited set together.
+        Such entries can only meet on the same level of the traversal, so levels are expanded one at a time and
+        every state keeps the list of probabilities that reached it. Neighbour lookups and weight normalization are
+        done once per state, while every probability is still compared to threshold on its own, so the same
+        branches are pruned as in _diffuse_iterative. Only the order in which values are added to G differs.
+    """
+    row = graph.row
+    level = {(sn, frozenset({sn})): [p1]}
+
+    while len(level) > 0:
+        next_level = {}
+        for (current_node, vN), probabilities in level.items():
+            if stats is not None:
+                stats.record_expansion(len(vN) - 1, len(level))
+            neighbours, weights, _ = row(current_node)
+            UNsn = [(node, weight) for node, weight in zip(neighbours, weights) if node not in vN]
+
+            if len(UNsn) == 0:
+                if len(vN) == graph.node_count:
+                    continue
+                if stats is not None:
+                    stats.record_uniform_spread(sum(probabilities))
+                for current_probability in probabilities:
+                    to_add = current_probability / (graph.node_count - len(vN))
+                    for node in range(graph.node_count):
+                        if node not in vN:
+                            G[node] += to_add
+                continue
+
+            if len(UNsn) == len(neighbours):
+                children = zip(neighbours, graph.fractions(current_node))
+            else:
+                sum_weights = 0
+                for _, weight in UNsn:
+                    sum_weights += weight
+                children = [(node, weight / sum_weights) for node, weight in UNsn]
+            if stats is not None:
+                children = list(children)
+                stats.pruned += sum(1 for _, fraction in children for current_probability in probabilities
+                                    if current_probability * fraction * alpha <= threshold)
+            for node, fraction in children:
+                has_unvisited = None
+                child_probabilities = []
+                for current_probability in probabilities:
+                    inherited_prob = current_probability * fraction
+                    G[node] += inherited_prob
+                    if inherited_prob * alpha > threshold:
+                        if has_unvisited is None:
+                            has_unvisited = any(x not in vN for x in row(node)[0])
+                        if has_unvisited:
+                            G[node] -= inherited_prob * alpha
+                            child_probabilities.append(inherited_prob * alpha)
+                if len(child_probabilities) > 0:
+                    next_level.setdefault((node, vN.union({node})), []).extend(child_probabilities)
+        level = next_level
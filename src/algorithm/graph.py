@@ -0,0 +1,201 @@
+"""
+
+    Graph backends used by the probability diffusion algorithm.
+
+    Function to_csr converts an adjacency matrix given as a pandas DataFrame, a scipy.sparse matrix, a NumPy array,
+    square nested lists or an edge list into a scipy.sparse CSR matrix which holds only positive edge weights, with the neighbours of
+    every node sorted by their index. Diffusion then works on the neighbour index and weight arrays of that matrix
+    instead of reading single cells of a dense DataFrame.
+
+    Class DiffusionGraph caches those arrays per node so many diffusions can run on the same network without
+    converting it again, and function as_diffusion_graph builds it from any of the supported adjacency types.
+
+"""
+from bisect import bisect_left
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+
+def to_csr(adj_mat, node_count=None):
+    if isinstance(adj_mat, pd.DataFrame):
+        # Nodes are addressed by position, same as with adj_mat.iloc
+        matrix = sp.csr_matrix(adj_mat.to_numpy())
+    elif sp.issparse(adj_mat):
+        matrix = sp.csr_matrix(adj_mat, copy=True)
+    elif isinstance(adj_mat, np.ndarray):
+        matrix = sp.csr_matrix(adj_mat)
+    elif _is_dense_matrix(adj_mat):
+        matrix = sp.csr_matrix(np.asarray(adj_mat))
+    else:
+        matrix = edge_list_to_csr(adj_mat, node_count)
+
+    if matrix.shape[0] != matrix.shape[1]:
+        raise ValueError(f"Adjacency matrix must be square, got shape {matrix.shape}")
+
+    # Only edges with positive weight connect two nodes
+    matrix.sum_duplicates()
+    matrix.data[matrix.data < 0] = 0
+    matrix.eliminate_zeros()
+    matrix.sort_indices()
+    return matrix
+
+
+def _is_dense_matrix(adj_mat):
+    """
+        Nested lists are a dense matrix when they are square and an edge list when every row holds 2 or 3 values.
+        Square lists with rows of 2 or 3 values can be either, so they have to be given as a NumPy array or passed
+        to edge_list_to_csr.
+    """
+    try:
+        shape = np.shape(adj_mat)
+    except ValueError:
+        # Rows of different lengths, edges with and without weight
+        return False
+    if len(shape) == 0 or shape == (0,):
+        # Iterators of edges and empty edge lists
+        return False
+    if len(shape) != 2:
+        raise ValueError(f"Adjacency must be a square matrix or a list of edges, got shape {shape}")
+    is_edge_list = shape[1] in (2, 3)
+    if shape[0] == shape[1] and is_edge_list:
+        raise ValueError(f"Adjacency of shape {shape} can be a matrix or a list of edges, pass a NumPy array for a "
+                         f"matrix or use edge_list_to_csr for edges")
+    if shape[0] != shape[1] and not is_edge_list:
+        raise ValueError(f"Adjacency must be a square matrix or a list of edges, got shape {shape}")
+    return not is_edge_list
+
+
+def edge_list_to_csr(edges, node_count=None):
+    """
+        Edges are (u, v) or (u, v, weight) tuples of an undirected graph. Edges without weight get weight 1 and
+        repeated edges have their weights summed.
+    """
+    rows = []
+    columns = []
+    weights = []
+    for edge in edges:
+        u, v = int(edge[0]), int(edge[1])
+        weight = edge[2] if len(edge) > 2 else 1
+        rows.append(u)
+        columns.append(v)
+        weights.append(weight)
+        if u != v:
+            rows.append(v)
+            columns.append(u)
+            weights.append(weight)
+
+    if node_count is None:
+        node_count = max(max(rows, default=-1), max(columns, default=-1)) + 1
+
+    return sp.csr_matrix((np.asarray(weights), (np.asarray(rows, dtype=np.int64), np.asarray(columns, dtype=np.int64))),
+                         shape=(node_count, node_count))
+
+
+class DiffusionGraph:
+    """
+        Adjacency of a fixed network prepared for repeated diffusion. Neighbour lists, weights and row weight sums
+        are built lazily the first time a node is reached and then kept, so work done for one diffusion is reused
+        by every later diffusion on the same graph.
+
+        Method set_edge changes the cached rows of a graph in place. CSR arrays are brought up to date only when
+        csr_arrays is called, so code working on the arrays directly has to get them from that method.
+    """
+
+    def __init__(self, indptr, indices, weights):
+        self.set_csr_arrays(indptr, indices, weights)
+
+    def set_csr_arrays(self, indptr, indices, weights):
+        """
+            Replaces the whole adjacency of the graph, cached rows of the previous arrays are dropped.
+        """
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self.node_count = len(indptr) - 1
+        # Node -> row, filled as nodes are reached, so a graph is created in the same time for any node count
+        self._rows = {}
+        self._fractions = {}
+        self._modified = set()
+
+    def row(self, node):
+        row = self._rows.get(node)
+        if row is None:
+            start, end = self.indptr[node], self.indptr[node + 1]
+            neighbours = self.indices[start:end].tolist()
+            weights = self.weights[start:end].tolist()
+            # Summed in neighbour order, same as diffusion sums weights of unvisited neighbours
+            weight_sum = 0
+            for weight in weights:
+                weight_sum += weight
+            row = (neighbours, weights, weight_sum)
+            self._rows[node] = row
+        return row
+
+    def fractions(self, node):
+        """
+            Share of the row weight sum carried by each neighbour, used when none of the neighbours is visited.
+        """
+        fractions = self._fractions.get(node)
+        if fractions is None:
+            neighbours, weights, weight_sum = self.row(node)
+            if len(weights) == 0:
+                fractions = []
+            elif node in self._modified:
+                fractions = (np.asarray(weights) / weight_sum).tolist()
+            else:
+                start, end = self.indptr[node], self.indptr[node + 1]
+                fractions = (self.weights[start:end] / weight_sum).tolist()
+            self._fractions[node] = fractions
+        return fractions
+
+    def set_edge(self, u, v, weight):
+        """
+            Sets weight of the edge from u to v, weight 0 or less removes the edge. For an undirected graph it has
+            to be called for both directions.
+        """
+        neighbours, weights, _ = self.row(u)
+        neighbours, weights = list(neighbours), list(weights)
+        position = bisect_left(neighbours, v)
+        if position < len(neighbours) and neighbours[position] == v:
+            if weight > 0:
+                weights[position] = weight
+            else:
+                del neighbours[position]
+                del weights[position]
+        elif weight > 0:
+            neighbours.insert(position, v)
+            weights.insert(position, weight)
+
+        weight_sum = 0
+        for node_weight in weights:
+            weight_sum += node_weight
+        self._rows[u] = (neighbours, weights, weight_sum)
+        self._fractions.pop(u, None)
+        self._modified.add(u)
+
+    def csr_arrays(self):
+        if len(self._modified) > 0:
+            rows = [self.row(node) for node in range(self.node_count)]
+            self.indptr = np.concatenate(([0], np.cumsum([len(neighbours) for neighbours, _, _ in rows])))
+            self.indices = np.array(list(chain.from_iterable(neighbours for neighbours, _, _ in rows)),
+                                    dtype=self.indices.dtype)
+            self.weights = np.array(list(chain.from_iterable(weights for _, weights, _ in rows)))
+            self._modified.clear()
+        return self.indptr, self.indices, self.weights
+
+    @property
+    def degrees(self):
+        return np.diff(self.csr_arrays()[0])
+
+    def neighbours(self, node):
+        return self.row(node)[0]
+
+
+def as_diffusion_graph(adj_mat):
+    if isinstance(adj_mat, DiffusionGraph):
+        return adj_mat
+    matrix = to_csr(adj_mat)
+    return DiffusionGraph(matrix.indptr, matrix.indices, matrix.data)
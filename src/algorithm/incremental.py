@@ -0,0 +1,114 @@
+"""
+
+    Implements caching of diffusion results for a network whose edge weights change over time.
+
+    Class IncrementalDiffusion keeps the result of every diffusion it has run together with the graph version it was
+    computed on and the set of nodes whose rows (neighbours and weights) the diffusion read. Diffusion depends on
+    the graph only through those rows, so after an edge between u and v changes, only results which read row u or
+    row v are dropped and computed again on the next request. All other results are served from the cache and are
+    identical to what a full recomputation would return.
+
+"""
+import numpy as np
+
+from src.algorithm.ctd import THRESHOLD_DIFF, _diffuse_iterative
+from src.algorithm.graph import as_diffusion_graph
+
+
+class _RecordingGraph:
+    """
+        View of a DiffusionGraph which remembers every node whose row was read.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.node_count = graph.node_count
+        self.touched = set()
+
+    def row(self, node):
+        self.touched.add(node)
+        return self.graph.row(node)
+
+    def fractions(self, node):
+        self.touched.add(node)
+        return self.graph.fractions(node)
+
+
+class IncrementalDiffusion:
+    """
+        Diffusion results of one network, kept up to date while its edges change. A DiffusionGraph passed as adj_mat
+        is changed in place by set_edge.
+    """
+
+    def __init__(self, adj_mat, alpha=0.5, threshold=THRESHOLD_DIFF):
+        self.graph = as_diffusion_graph(adj_mat)
+        self.alpha = alpha
+        self.threshold = threshold
+        self.version = 0
+        self.hits = 0
+        self.recomputations = 0
+        # (sn, p1) -> (graph version result was computed on, result, nodes whose rows were read)
+        self._results = {}
+        # node -> keys of results which read its row
+        self._dependents = {}
+
+    def diffuse(self, sn, p1):
+        """
+            Returns node probabilities after diffusing p1 from sn, starting from p1 on sn and 0 everywhere else.
+        """
+        key = (sn, p1)
+        cached = self._results.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached[1].copy()
+
+        self.recomputations += 1
+        recording_graph = _RecordingGraph(self.graph)
+        G = [0] * self.graph.node_count
+        G[sn] = p1
+        _diffuse_iterative(p1, sn, G, recording_graph, self.alpha, self.threshold)
+
+        result = np.array(G, dtype=np.float64)
+        self._results[key] = (self.version, result, recording_graph.touched)
+        for node in recording_graph.touched:
+            self._dependents.setdefault(node, set()).add(key)
+        return result.copy()
+
+    def result_version(self, sn, p1):
+        """
+            Graph version the cached result was computed on, None if there is no cached result.
+        """
+        cached = self._results.get((sn, p1))
+        return None if cached is None else cached[0]
+
+    def set_edge(self, u, v, weight, symmetric=True):
+        self.update_edges([(u, v, weight)], symmetric)
+
+    def update_edges(self, edges, symmetric=True):
+        """
+            Sets weights of (u, v, weight) edges, weight 0 removes an edge, and drops every result that depends on
+            the changed rows.
+        """
+        changed_rows = set()
+        for u, v, weight in edges:
+            self.graph.set_edge(u, v, weight)
+            changed_rows.add(u)
+            if symmetric and u != v:
+                self.graph.set_edge(v, u, weight)
+                changed_rows.add(v)
+        self.version += 1
+
+        for node in changed_rows:
+            for key in self._dependents.pop(node, ()):
+                self._invalidate(key)
+
+    def _invalidate(self, key):
+        cached = self._results.pop(key, None)
+        if cached is None:
+            return
+        for node in cached[2]:
+            dependents = self._dependents.get(node)
+            if dependents is not None:
+                dependents.discard(key)
+                if len(dependents) == 0:
+                    del self._dependents[node]
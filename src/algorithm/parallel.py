@@ -0,0 +1,77 @@
+"""
+
+    Implements parallel probability diffusion from many starting nodes over the same network.
+
+    Function DIFFUSE_PROB_PARALLEL accepts the same sources as DIFFUSE_PROB_BATCH and returns the same array. CSR
+    arrays of the graph and the result array are placed in multiprocessing.shared_memory once, worker processes
+    attach to them when the pool starts and every task only carries the starting nodes it has to diffuse from, so
+    the graph is never pickled per task. Each worker writes its rows straight into the shared result array.
+
+"""
+import math
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from src.algorithm.batch import DIFFUSE_PROB_BATCH, _diffuse_row, _read_sources
+from src.algorithm.ctd import THRESHOLD_DIFF
+from src.algorithm.graph import DiffusionGraph, as_diffusion_graph
+
+# State of a worker process, filled once by _attach_worker
+_worker = {}
+
+
+def DIFFUSE_PROB_PARALLEL(sources, adj_mat, alpha=0.5, threshold=THRESHOLD_DIFF, processes=None, chunk_size=None):
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    if processes == 1:
+        return DIFFUSE_PROB_BATCH(sources, adj_mat, alpha, threshold)
+
+    graph = as_diffusion_graph(adj_mat)
+    distributions, starts = _read_sources(sources, graph.node_count)
+    if chunk_size is None:
+        chunk_size = max(1, math.ceil(len(starts) / (processes * 4)))
+    indexed_starts = list(enumerate(starts))
+    chunks = [indexed_starts[begin:begin + chunk_size] for begin in range(0, len(starts), chunk_size)]
+
+    blocks = []
+    try:
+        descriptors = {}
+        indptr, indices, weights = graph.csr_arrays()
+        for name, array in (("indptr", indptr), ("indices", indices), ("weights", weights), ("result", distributions)):
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            blocks.append(block)
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            descriptors[name] = (block.name, array.shape, array.dtype.str)
+
+        with multiprocessing.Pool(processes, initializer=_attach_worker, initargs=(descriptors, alpha, threshold)) as pool:
+            for _ in pool.imap_unordered(_diffuse_chunk, chunks):
+                pass
+
+        _, shape, dtype = descriptors["result"]
+        return np.ndarray(shape, dtype=dtype, buffer=blocks[-1].buf).copy()
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+def _attach_worker(descriptors, alpha, threshold):
+    arrays = {}
+    for name, (block_name, shape, dtype) in descriptors.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        # Keep the block referenced, otherwise its buffer is released while the arrays still use it
+        _worker.setdefault("blocks", []).append(block)
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+    _worker["graph"] = DiffusionGraph(arrays["indptr"], arrays["indices"], arrays["weights"])
+    _worker["result"] = arrays["result"]
+    _worker["alpha"] = alpha
+    _worker["threshold"] = threshold
+
+
+def _diffuse_chunk(chunk):
+    graph, result, alpha, threshold = _worker["graph"], _worker["result"], _worker["alpha"], _worker["threshold"]
+    for source, source_starts in chunk:
+        _diffuse_row(result[source], source_starts, graph, alpha, threshold)
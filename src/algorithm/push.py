@@ -0,0 +1,126 @@
+"""
+
+    Implements approximate probability diffusion by local pushes of residual probability.
+
+    Exact diffusion follows every path from the starting node separately, which can not finish on networks with
+    hundreds of thousands of nodes. Function DIFFUSE_PROB_PUSH instead keeps, for every node, the residual
+    probability it still has to send. A node with residual above residual_tolerance pushes it to its neighbours in
+    proportion to edge weights, each neighbour keeps (1 - alpha) of what it receives and adds the rest to its own
+    residual. Residuals arriving at the same node through different paths are merged, so work is proportional to
+    the probability settled (at most p1 / ((1 - alpha) * residual_tolerance) pushes), not to the number of paths.
+    Residuals left at or below residual_tolerance stay on their nodes, same as probability the exact engines do not
+    send further.
+
+    The result differs from exact diffusion in two ways:
+        truncation - residuals left on their nodes would still be pushed further. Moving a leftover residual r
+                     changes the result by at most 2 * r in L1 norm, so the result is within 2 * R of the result
+                     with no cut-off, where R is the sum of leftover residuals, at most (node count - 1) *
+                     residual_tolerance. This part goes to 0 with residual_tolerance. With error_tolerance set,
+                     residual_tolerance is halved and pushing continues until 2 * R <= error_tolerance, so the result
+                     is within error_tolerance of the result with no cut-off.
+        returning paths - paths are not tracked, so only the starting node counts as visited and probability flows
+                     back to nodes it already passed through, which the exact engines never do. This part does not
+                     depend on residual_tolerance and stays as residual_tolerance goes to 0. It is small on dense
+                     graphs, where little probability returns, and largest on small or sparse ones.
+    For example on graph_50_nodes_0.5_probability.csv the L1 difference from exact diffusion with threshold 1e-5 falls
+    from about 0.26 * p1 to 0.03 * p1 and 0.01 * p1 for residual_tolerance 1e-2, 1e-3 and 1e-4, while on
+    graph_5_nodes.csv it stays between 0.1 * p1 and 0.19 * p1 for every residual_tolerance. Function
+    PUSH_ACCURACY_REPORT measures the difference on other graphs.
+
+"""
+from collections import deque
+
+import numpy as np
+
+from src.algorithm.ctd import THRESHOLD_DIFF, _buffer, _diffuse_iterative, _write_back
+from src.algorithm.graph import as_diffusion_graph
+
+# Threshold of the exact diffusion push results are compared with, fine enough that its own pruning is negligible
+EXACT_THRESHOLD = 1e-5
+
+
+def DIFFUSE_PROB_PUSH(p1, sn, G, adj_mat, alpha=0.5, residual_tolerance=THRESHOLD_DIFF, error_tolerance=None):
+    graph = as_diffusion_graph(adj_mat)
+    row = graph.row
+    buffer = _buffer(G)
+
+    neighbours, weights, _ = row(sn)
+    if not any(node != sn for node in neighbours):
+        # Same as exact diffusion, probability of a node without neighbours is spread over all other nodes
+        if graph.node_count > 1:
+            to_add = p1 / (graph.node_count - 1)
+            for node in range(graph.node_count):
+                if node != sn:
+                    buffer[node] += to_add
+        return _write_back(G, buffer)
+
+    residual = {sn: p1}
+    queue = deque([sn])
+    while True:
+        _push(sn, buffer, row, alpha, residual_tolerance, residual, queue)
+        if error_tolerance is None or 2 * sum(residual.values()) <= error_tolerance:
+            break
+        residual_tolerance /= 2
+        queue.extend(node for node, probability in residual.items() if probability > residual_tolerance)
+
+    # Residuals which never grew above residual_tolerance stay on their nodes
+    for node, probability in residual.items():
+        buffer[node] += probability
+    return _write_back(G, buffer)
+
+
+def _push(sn, buffer, row, alpha, residual_tolerance, residual, queue):
+    while len(queue) > 0:
+        current_node = queue.popleft()
+        current_probability = residual.pop(current_node)
+
+        neighbours, weights, _ = row(current_node)
+        targets = [(node, weight) for node, weight in zip(neighbours, weights) if node != sn and node != current_node]
+        if len(targets) == 0:
+            # Nowhere to send, probability stays on the node
+            buffer[current_node] += current_probability
+            continue
+
+        sum_weights = 0
+        for _, weight in targets:
+            sum_weights += weight
+        for node, weight in targets:
+            inherited_prob = current_probability * (weight / sum_weights)
+            buffer[node] += inherited_prob - inherited_prob * alpha
+            previous = residual.get(node, 0)
+            residual[node] = previous + inherited_prob * alpha
+            if previous <= residual_tolerance < residual[node]:
+                queue.append(node)
+
+
+def PUSH_ACCURACY_REPORT(adj_mat, start_nodes=None, p1=0.5, alpha=0.5, residual_tolerance=THRESHOLD_DIFF,
+                         error_tolerance=None, exact_threshold=EXACT_THRESHOLD):
+    """
+        Compares DIFFUSE_PROB_PUSH with the exact iterative diffusion with threshold exact_threshold from every start
+        node. Returns the largest absolute difference on a single node and the largest and mean L1 difference over
+        all nodes, also relative to p1.
+    """
+    graph = as_diffusion_graph(adj_mat)
+    if start_nodes is None:
+        start_nodes = range(graph.node_count)
+
+    max_error = 0
+    l1_errors = []
+    for sn in start_nodes:
+        exact = [0] * graph.node_count
+        _diffuse_iterative(p1, sn, exact, graph, alpha, exact_threshold)
+        approximate = [0] * graph.node_count
+        DIFFUSE_PROB_PUSH(p1, sn, approximate, graph, alpha, residual_tolerance, error_tolerance)
+
+        errors = np.abs(np.array(exact) - np.array(approximate))
+        max_error = max(max_error, float(errors.max(initial=0)))
+        l1_errors.append(float(errors.sum()))
+
+    max_l1_error = max(l1_errors, default=0)
+    return {
+        "max_error": max_error,
+        "max_l1_error": max_l1_error,
+        "mean_l1_error": sum(l1_errors) / len(l1_errors) if l1_errors else 0,
+        "relative_max_error": max_error / p1,
+        "relative_max_l1_error": max_l1_error / p1,
+    }
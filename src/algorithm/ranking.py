@@ -0,0 +1,126 @@
+"""
+
+    Implements CTD node ranking: a walk over the network which repeatedly diffuses probability from the last drawn
+    node and draws the unvisited node that received the most.
+
+    A walk from start node s visits s first. At every step p1 is diffused from the current node with all drawn nodes
+    visited, while 1 - p1 is spread evenly over the unvisited nodes, and the unvisited node with the highest
+    probability (lowest index among equal ones) is drawn next. When the current node has no unvisited neighbour, it
+    is first connected to its extended neighbours (see src/algorithm/connect_to_ext.py), same as in the R
+    implementation. A walk ends when every node of S is drawn, when more than num_misses nodes outside S are drawn
+    in a row, or when no unvisited node is left.
+
+    Diffusion results depend only on the current node and the set of drawn nodes, so class NodeRanker keeps them in
+    an LRU cache keyed by that state. Walks which reach a state already seen, for example walks from the same start
+    node with a different S, or walks from different start nodes which meet, reuse the stored result. The cache holds
+    at most cache_size results and max_memory bytes of result arrays and their keys, whose sets of drawn nodes grow
+    with the walk, least recently used results are dropped first.
+
+"""
+import sys
+from collections import OrderedDict
+
+import numpy as np
+
+from src.algorithm.connect_to_ext import CONNECT_TO_EXT
+from src.algorithm.ctd import THRESHOLD_DIFF, _diffuse_recursive
+from src.algorithm.graph import as_diffusion_graph
+
+CACHE_SIZE = 10000
+MAX_MEMORY = 2 ** 30
+
+
+def _entry_size(key, result):
+    return sys.getsizeof(key[1]) + result.nbytes
+
+
+class NodeRanker:
+
+    def __init__(self, adj_mat, p1=1.0, alpha=0.5, threshold=THRESHOLD_DIFF, cache_size=CACHE_SIZE,
+                 max_memory=MAX_MEMORY):
+        self.graph = as_diffusion_graph(adj_mat)
+        self.p1 = p1
+        self.alpha = alpha
+        self.threshold = threshold
+        self.cache_size = cache_size
+        self.max_memory = max_memory
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.memory = 0
+        # (sn, frozenset of drawn nodes) -> node probabilities
+        self._results = OrderedDict()
+
+    def diffuse(self, sn, visited_nodes):
+        """
+            Returns node probabilities of one ranking step from sn, with visited_nodes (which include sn) drawn. The
+            returned array is shared with the cache and must not be changed.
+        """
+        key = (sn, frozenset(visited_nodes))
+        result = self._results.get(key)
+        if result is not None:
+            self.cache_hits += 1
+            self._results.move_to_end(key)
+            return result
+
+        self.cache_misses += 1
+        result = self._compute(sn, key[1])
+        result.flags.writeable = False
+        self._store(key, result)
+        return result
+
+    def _compute(self, sn, vN):
+        node_count = self.graph.node_count
+        G = [0.0] * node_count
+        if len(vN) < node_count:
+            base_probability = (1 - self.p1) / (node_count - len(vN))
+            for node in range(node_count):
+                if node not in vN:
+                    G[node] = base_probability
+
+        graph = self.graph
+        if not any(node not in vN for node in graph.neighbours(sn)):
+            graph = CONNECT_TO_EXT(graph, sn, vN)
+        _diffuse_recursive(self.p1, sn, G, set(vN), graph, self.alpha, self.threshold)
+        return np.array(G, dtype=np.float64)
+
+    def _store(self, key, result):
+        size = _entry_size(key, result)
+        if size > self.max_memory or self.cache_size <= 0:
+            return
+        self._results[key] = result
+        self.memory += size
+        while len(self._results) > self.cache_size or self.memory > self.max_memory:
+            self.memory -= _entry_size(*self._results.popitem(last=False))
+
+    def rank(self, start, S=None, num_misses=None):
+        """
+            Returns nodes in the order they were drawn by the walk from start, start first. Without S the walk goes
+            on until every node is drawn.
+        """
+        S = set(range(self.graph.node_count)) if S is None else set(S)
+        drawn = [start]
+        visited = {start}
+        misses = 0
+        while not S <= visited and len(visited) < self.graph.node_count:
+            probabilities = self.diffuse(drawn[-1], visited)
+            candidates = np.ones(self.graph.node_count, dtype=bool)
+            candidates[list(visited)] = False
+            unvisited = np.flatnonzero(candidates)
+            node = int(unvisited[np.argmax(probabilities[unvisited])])
+
+            drawn.append(node)
+            visited.add(node)
+            misses = 0 if node in S else misses + 1
+            if num_misses is not None and misses > num_misses:
+                break
+        return drawn
+
+    def rank_all(self, S, num_misses=None):
+        """
+            Returns ranking of every node in S, each started from that node.
+        """
+        return {start: self.rank(start, S, num_misses) for start in S}
+
+    def clear(self):
+        self._results.clear()
+        self.memory = 0
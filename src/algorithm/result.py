@@ -0,0 +1,49 @@
+"""
+
+    Helpers for node probabilities held in NumPy arrays.
+
+    Function new_probabilities allocates the array diffusion engines accumulate into, optionally in float32 to halve
+    its memory, with p1 already placed on the starting node. Functions top_k and normalize work on whole arrays, so
+    diffusion results can be ranked and scored without building a Python object per node.
+
+"""
+import numpy as np
+
+
+def new_probabilities(node_count, sn=None, p1=0, dtype=np.float64):
+    G = np.zeros(node_count, dtype=dtype)
+    if sn is not None:
+        G[sn] = p1
+    return G
+
+
+def top_k(G, k, exclude=()):
+    """
+        Returns indices and probabilities of the k nodes with the highest probability, highest first. Nodes with
+        equal probability are ordered by index and nodes in exclude are left out.
+    """
+    probabilities = np.asarray(G)
+    candidates = np.ones(len(probabilities), dtype=bool)
+    candidates[list(exclude)] = False
+    nodes = np.flatnonzero(candidates)
+    k = min(k, len(nodes))
+    if k <= 0:
+        return nodes[:0], probabilities[:0]
+
+    if k < len(nodes):
+        # Nodes equal to the k-th highest probability are all kept, so ties are broken by index below
+        kth_highest = np.partition(probabilities[nodes], len(nodes) - k)[len(nodes) - k]
+        nodes = nodes[probabilities[nodes] >= kth_highest]
+    nodes = nodes[np.lexsort((nodes, -probabilities[nodes]))][:k]
+    return nodes, probabilities[nodes]
+
+
+def normalize(G, total=1):
+    """
+        Returns a new array of probabilities scaled to sum to total.
+    """
+    probabilities = np.asarray(G)
+    probability_sum = probabilities.sum()
+    if probability_sum == 0:
+        raise ValueError("Probabilities sum to 0 and can not be normalized")
+    return probabilities * (total / probability_sum)
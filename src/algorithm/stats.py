@@ -0,0 +1,58 @@
+"""
+
+    Used for collecting statistics of a probability diffusion run.
+
+    An instance of DiffusionStats passed to DIFFUSE_PROB_RECURSIVE or DIFFUSE_PROB_ITERATIVE counts expanded states,
+    deepest path, largest frontier (queue of the iterative engine), branches pruned by threshold and probability
+    spread uniformly from nodes without unvisited neighbours, and measures time spent preparing the graph and
+    diffusing. Counters add up over calls, so one instance can collect statistics of many runs. Without an instance
+    the engines skip all bookkeeping.
+
+"""
+import time
+from contextlib import contextmanager
+
+
+class DiffusionStats:
+
+    def __init__(self):
+        self.expansions = 0
+        self.max_depth = 0
+        self.max_frontier = 0
+        self.pruned = 0
+        self.uniform_spreads = 0
+        self.uniform_spread_probability = 0
+        self.phase_times = {}
+
+    def record_expansion(self, depth, frontier):
+        self.expansions += 1
+        if depth > self.max_depth:
+            self.max_depth = depth
+        if frontier > self.max_frontier:
+            self.max_frontier = frontier
+
+    def record_uniform_spread(self, probability):
+        self.uniform_spreads += 1
+        self.uniform_spread_probability += probability
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phase_times[name] = self.phase_times.get(name, 0) + time.perf_counter() - start
+
+    def as_dict(self):
+        return {
+            "expansions": self.expansions,
+            "max_depth": self.max_depth,
+            "max_frontier": self.max_frontier,
+            "pruned": self.pruned,
+            "uniform_spreads": self.uniform_spreads,
+            "uniform_spread_probability": self.uniform_spread_probability,
+            "phase_times": dict(self.phase_times),
+        }
+
+    def __repr__(self):
+        return f"DiffusionStats({self.as_dict()})"
@@ -0,0 +1,111 @@
+"""
+
+    Implements probability diffusion for many thresholds and alphas in a single traversal.
+
+    Function DIFFUSE_PROB_SWEEP returns an array of shape (len(alphas), len(thresholds), node count) where entry
+    [a, k] equals G after DIFFUSE_PROB_ITERATIVE with alphas[a] and thresholds[k], starting from G which holds p1 on
+    sn and 0 everywhere else.
+
+    Probability sent along a path only gets smaller, so a state which is expanded for some threshold is expanded for
+    every smaller threshold too. The traversal is therefore done once for the smallest threshold, while every state
+    carries its probability for each alpha. Every amount added to G is recorded together with the number of sorted
+    thresholds for which it happens, and the results for all thresholds are then built as cumulative sums, refining
+    the result of the largest threshold down to the smallest one.
+
+"""
+from bisect import bisect_left
+from collections import deque
+
+import numpy as np
+
+from src.algorithm.graph import as_diffusion_graph
+
+
+def DIFFUSE_PROB_SWEEP(p1, sn, adj_mat, thresholds, alphas=(0.5,)):
+    graph = as_diffusion_graph(adj_mat)
+    row = graph.row
+    node_count = graph.node_count
+    threshold_count = len(thresholds)
+
+    order = sorted(range(threshold_count), key=lambda k: thresholds[k])
+    sorted_thresholds = [thresholds[k] for k in order]
+    lowest_threshold = sorted_thresholds[0]
+
+    # differences[a][j][node] is added to G[node] for alpha a and for every sorted threshold with index below j
+    differences = [[None] * (threshold_count + 1) for _ in alphas]
+
+    def bucket(alpha_index, level):
+        values = differences[alpha_index][level]
+        if values is None:
+            values = differences[alpha_index][level] = [0] * node_count
+        return values
+
+    # Every state holds, per alpha, its probability and the number of sorted thresholds it is expanded for
+    queue = deque([([p1] * len(alphas), [threshold_count] * len(alphas), (sn, None))])
+
+    while len(queue) > 0:
+        probabilities, levels, path = queue.popleft()
+        current_node = path[0]
+        vN = set()
+        link = path
+        while link is not None:
+            vN.add(link[0])
+            link = link[1]
+
+        neighbours, weights, _ = row(current_node)
+        UNsn = [(node, weight) for node, weight in zip(neighbours, weights) if node not in vN]
+
+        if len(UNsn) == 0:
+            if len(vN) == node_count:
+                continue
+            for alpha_index, (current_probability, level) in enumerate(zip(probabilities, levels)):
+                if level == 0:
+                    continue
+                to_add = current_probability / (node_count - len(vN))
+                values = bucket(alpha_index, level)
+                for node in range(node_count):
+                    if node not in vN:
+                        values[node] += to_add
+            continue
+
+        if len(UNsn) == len(neighbours):
+            children = zip(neighbours, graph.fractions(current_node))
+        else:
+            sum_weights = 0
+            for _, weight in UNsn:
+                sum_weights += weight
+            children = [(node, weight / sum_weights) for node, weight in UNsn]
+        for node, fraction in children:
+            has_unvisited = None
+            child_probabilities = []
+            child_levels = []
+            for alpha_index, alpha in enumerate(alphas):
+                level = levels[alpha_index]
+                child_level = 0
+                inherited_prob = 0
+                if level > 0:
+                    inherited_prob = probabilities[alpha_index] * fraction
+                    bucket(alpha_index, level)[node] += inherited_prob
+                    if inherited_prob * alpha > lowest_threshold:
+                        if has_unvisited is None:
+                            has_unvisited = any(x not in vN for x in row(node)[0])
+                        if has_unvisited:
+                            child_level = bisect_left(sorted_thresholds, inherited_prob * alpha)
+                            bucket(alpha_index, child_level)[node] -= inherited_prob * alpha
+                child_probabilities.append(inherited_prob * alpha)
+                child_levels.append(child_level)
+            if any(child_levels):
+                queue.append((child_probabilities, child_levels, (node, path)))
+
+    sorted_result = np.zeros((len(alphas), threshold_count, node_count))
+    for alpha_index in range(len(alphas)):
+        G = np.zeros(node_count)
+        for level in range(threshold_count, 0, -1):
+            if differences[alpha_index][level] is not None:
+                G += differences[alpha_index][level]
+            sorted_result[alpha_index, level - 1] = G
+    sorted_result[:, :, sn] += p1
+
+    result = np.empty_like(sorted_result)
+    result[:, order] = sorted_result
+    return result
@@ -0,0 +1,264 @@
+"""
+
+    Used for performance testing of probability diffusion engines.
+
+    Every engine is run on the NUMBER_OF_NODES x PROBABILITY grid of test graphs and on larger generated graphs.
+    For every graph and engine the average time per call, number of expanded states per second and peak memory
+    measured by tracemalloc are written to a JSON file. Expanded states are counted for every engine on its own, as
+    merging states or a budget changes how many are expanded, and are left out (null) for engines which do not expand
+    states one by one, the batch and push engines. A run can be compared to a stored baseline run, in which case
+    every result slower or using more memory than the baseline by more than the tolerance is reported as a regression
+    and the process exits with status 1. An increase also has to exceed an absolute minimum (MIN_DELTAS), so timing
+    noise of calls taking tens of microseconds is not reported. Results of approximate engines also hold their error against the exact
+    iterative engine.
+
+    Usage:
+        python -m src.util.benchmark --output results.json [--baseline baseline.json] [--tolerance 0.25]
+
+"""
+import argparse
+import json
+import os.path
+import platform
+import random
+import sys
+import time
+import timeit
+import tracemalloc
+
+import numpy as np
+
+from src.algorithm.bounded import DIFFUSE_PROB_BOUNDED
+from src.algorithm.batch import DIFFUSE_PROB_BATCH
+from src.algorithm.ctd import *
+from src.algorithm.graph import as_diffusion_graph
+from src.algorithm.push import DIFFUSE_PROB_PUSH, PUSH_ACCURACY_REPORT
+from src.algorithm.stats import DiffusionStats
+from src.util.console import *
+from src.util.generate import TOPOLOGIES, generate_graph, graph_name
+from src.util.graph_io import read_csv_graph
+from src.util.path import *
+
+STARTING_PROBABILITY = 0.5
+
+NUMBER_OF_NODES = [10, 50, 500, 2000]
+PROBABILITY = [0.15, 0.25, 0.5, 0.75, 0.9]
+LARGE_NUMBER_OF_NODES = [5000, 10000, 100000]
+LARGE_TOPOLOGIES = list(TOPOLOGIES)
+
+NUMBER_OF_START_NODES = 5
+
+# Smallest increase over the baseline reported as a regression, seconds per call and bytes
+MIN_DELTAS = {
+    "time_per_call": 5e-5,
+    "peak_memory": 64 * 1024,
+}
+
+data_folder = get_project_root() + "/test/data/graph"
+
+
+def _run_recursive(graph, sn, probabilities, stats=None):
+    DIFFUSE_PROB_RECURSIVE(STARTING_PROBABILITY, sn, probabilities, {sn}, graph, stats=stats)
+
+
+def _run_depth_first(graph, sn, probabilities, stats=None):
+    DIFFUSE_PROB_DEPTH_FIRST(STARTING_PROBABILITY, sn, probabilities, {sn}, graph, stats=stats)
+
+
+def _run_iterative(graph, sn, probabilities, stats=None):
+    DIFFUSE_PROB_ITERATIVE(STARTING_PROBABILITY, sn, probabilities, graph, stats=stats)
+
+
+def _run_merged(graph, sn, probabilities, stats=None):
+    DIFFUSE_PROB_ITERATIVE(STARTING_PROBABILITY, sn, probabilities, graph, merge_states=True, stats=stats)
+
+
+def _run_bounded(graph, sn, probabilities, stats=None):
+    response = DIFFUSE_PROB_BOUNDED(STARTING_PROBABILITY, sn, probabilities, graph)
+    if stats is not None:
+        stats.expansions += response.expansions
+
+
+def _run_batch(graph, sn, probabilities):
+    DIFFUSE_PROB_BATCH([(sn, STARTING_PROBABILITY)], graph)
+
+
+def _run_push(graph, sn, probabilities):
+    DIFFUSE_PROB_PUSH(STARTING_PROBABILITY, sn, probabilities, graph)
+
+
+ENGINES = {
+    "recursive": _run_recursive,
+    "depth_first": _run_depth_first,
+    "iterative": _run_iterative,
+    "iterative_merged": _run_merged,
+    "bounded": _run_bounded,
+    "batch": _run_batch,
+    "push": _run_push,
+}
+
+# Engines which count their expanded states in a DiffusionStats instance passed as stats
+COUNTING_ENGINES = ["recursive", "depth_first", "iterative", "iterative_merged", "bounded"]
+
+# Approximate engines and functions measuring their error against the exact engines
+ACCURACY_REPORTS = {
+    "push": PUSH_ACCURACY_REPORT,
+}
+
+
+def grid_graphs():
+    for node_count in NUMBER_OF_NODES:
+        for edge_probability in PROBABILITY:
+            name = f"graph_{node_count}_nodes_{edge_probability}_probability"
+            if not os.path.isfile(f"{data_folder}/{name}.csv"):
+                write_warning_message(f"Test graph \'{relative_path(data_folder)}/{name}.csv\' not found")
+                continue
+            yield name, lambda path=f"{data_folder}/{name}.csv": read_csv_graph(path)
+
+
+def large_graphs(sizes, topologies=LARGE_TOPOLOGIES):
+    for topology in topologies:
+        for node_count in sizes:
+            yield f"generated_{graph_name(topology, node_count)}", \
+                lambda t=topology, n=node_count: generate_graph(t, n)
+
+
+def count_expansions(engine_name, graph, start_nodes):
+    """
+        Returns average number of states expanded by the engine per call, or None if the engine does not count them.
+    """
+    if engine_name not in COUNTING_ENGINES:
+        return None
+    stats = DiffusionStats()
+    for sn in start_nodes:
+        probabilities = [0] * graph.node_count
+        probabilities[sn] = STARTING_PROBABILITY
+        ENGINES[engine_name](graph, sn, probabilities, stats)
+    return stats.expansions / len(start_nodes)
+
+
+def measure(engine, graph, start_nodes):
+    def run_all():
+        for sn in start_nodes:
+            probabilities = [0] * graph.node_count
+            probabilities[sn] = STARTING_PROBABILITY
+            engine(graph, sn, probabilities)
+
+    # First run fills the graph cache, so only diffusion itself is measured afterwards
+    run_all()
+
+    tracemalloc.start()
+    run_all()
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timer = timeit.Timer(run_all)
+    number, _ = timer.autorange()
+    time_per_call = min(timer.repeat(repeat=3, number=number)) / (number * len(start_nodes))
+    return time_per_call, peak_memory
+
+
+def run_benchmarks(engines, large_sizes, topologies=LARGE_TOPOLOGIES):
+    results = []
+    graphs = list(grid_graphs()) + list(large_graphs(large_sizes, topologies))
+    for name, load in graphs:
+        write_normal_message(f"Benchmarking \'{name}\'")
+        graph = as_diffusion_graph(load())
+        start_nodes = random.Random(name).sample(range(graph.node_count),
+                                                 min(NUMBER_OF_START_NODES, graph.node_count))
+
+        for engine_name in engines:
+            time_per_call, peak_memory = measure(ENGINES[engine_name], graph, start_nodes)
+            expansions = count_expansions(engine_name, graph, start_nodes)
+            result = {
+                "graph": name,
+                "nodes": graph.node_count,
+                "edges": int(graph.indptr[-1]),
+                "engine": engine_name,
+                "time_per_call": time_per_call,
+                "expansions": expansions,
+                "expansions_per_second": expansions / time_per_call
+                if expansions is not None and time_per_call > 0 else None,
+                "peak_memory": peak_memory,
+            }
+            message = f"    {engine_name:<18}{time_per_call * 1000:10.3f} ms{peak_memory / 1024:12.1f} KiB"
+            if engine_name in ACCURACY_REPORTS:
+                result["accuracy"] = ACCURACY_REPORTS[engine_name](graph, start_nodes, STARTING_PROBABILITY)
+                message += f"    max error {result['accuracy']['max_error']:.4g}"
+            results.append(result)
+            write_normal_message(message)
+    return results
+
+
+def find_regressions(results, baseline, tolerance, min_deltas=MIN_DELTAS):
+    baseline_results = {(result["graph"], result["engine"]): result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        previous = baseline_results.get((result["graph"], result["engine"]))
+        if previous is None:
+            continue
+        for metric in ["time_per_call", "peak_memory"]:
+            if result[metric] > previous[metric] * (1 + tolerance) and \
+                    result[metric] - previous[metric] > min_deltas[metric]:
+                regressions.append({
+                    "graph": result["graph"],
+                    "engine": result["engine"],
+                    "metric": metric,
+                    "baseline": previous[metric],
+                    "current": result[metric],
+                })
+    return regressions
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Benchmark probability diffusion engines.")
+    parser.add_argument("--output", default="benchmark.json", help="JSON file results are written to")
+    parser.add_argument("--baseline", help="JSON file of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed relative increase of time and memory over the baseline")
+    parser.add_argument("--min-time-delta", type=float, default=MIN_DELTAS["time_per_call"],
+                        help="smallest increase of time per call in seconds reported as a regression")
+    parser.add_argument("--min-memory-delta", type=int, default=MIN_DELTAS["peak_memory"],
+                        help="smallest increase of peak memory in bytes reported as a regression")
+    parser.add_argument("--engines", nargs="+", choices=list(ENGINES), default=list(ENGINES))
+    parser.add_argument("--large-sizes", nargs="*", type=int, default=LARGE_NUMBER_OF_NODES,
+                        help="node counts of generated graphs added to the test graphs")
+    parser.add_argument("--topologies", nargs="*", choices=list(TOPOLOGIES), default=LARGE_TOPOLOGIES,
+                        help="topologies of generated graphs (see src/util/generate.py)")
+    arguments = parser.parse_args(arguments)
+
+    write_header_message("Running benchmarks:")
+    results = run_benchmarks(arguments.engines, arguments.large_sizes, arguments.topologies)
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "threshold": THRESHOLD_DIFF,
+        "starting_probability": STARTING_PROBABILITY,
+        "results": results,
+    }
+
+    if arguments.baseline is not None:
+        with open(arguments.baseline) as file:
+            baseline = json.load(file)
+        regressions = find_regressions(results, baseline, arguments.tolerance, {
+            "time_per_call": arguments.min_time_delta,
+            "peak_memory": arguments.min_memory_delta,
+        })
+        report["regressions"] = regressions
+        for regression in regressions:
+            write_fail_message(f"REGRESSION - {regression['engine']} on \'{regression['graph']}\': "
+                               f"{regression['metric']} {regression['baseline']:.6g} -> {regression['current']:.6g}")
+
+    with open(arguments.output, "w") as file:
+        json.dump(report, file, indent=2)
+
+    if report.get("regressions"):
+        return 1
+    write_success_message(f"SUCCESS - Results written to \'{arguments.output}\'")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,90 +1,153 @@
 """
 
     Used to visualize a network graph.
-    
+
     Function draw_graph creates visualization of a graph with each node coloured according to its probability value
     and the result is stored in a html file named as requested by the third parameter of the function.
-     
+
+    Node positions computed by the spring layout are cached by a hash of the graph content, in memory and in
+    Visualization/layouts, so drawing many probability results of the same graph computes the layout only once.
+
+    Graphs with more than WEBGL_NODE_COUNT nodes are drawn with WebGL (Scattergl) traces. For large graphs only the
+    top_k nodes with the highest probability can be drawn, and at most max_edges edges are drawn, keeping those
+    whose end nodes have the highest probability.
+
 """
 
+import hashlib
+import os.path
+
+import numpy as np
 import plotly.graph_objects as go
 import networkx as nx
+
+from src.algorithm.result import top_k as top_k_nodes
 from src.util.path import get_project_root
-import os.path
 
+WEBGL_NODE_COUNT = 2000
+MAX_EDGES = 20000
+LAYOUT_SEED = 0
+
+folder_path = get_project_root() + "/Visualization"
+layout_folder = folder_path + "/layouts"
+
+# Graph hash -> node positions, in order of graph.nodes()
+_layouts = {}
+
+
+def graph_hash(graph):
+    digest = hashlib.sha256()
+    digest.update(repr(list(graph.nodes())).encode())
+    digest.update(repr(sorted((str(u), str(v), str(data.get("weight", 1))) for u, v, data in graph.edges(data=True)))
+                  .encode())
+    return digest.hexdigest()
 
-def draw_graph(graph, prob, name, startNode, start_probability):
-    pos = nx.spring_layout(graph)
 
-    edge_x = []
-    edge_y = []
-    for edge in graph.edges():
-        x0, y0 = pos[edge[0]]
-        x1, y1 = pos[edge[1]]
-        edge_x.append(x0)
-        edge_x.append(x1)
-        edge_x.append(None)
-        edge_y.append(y0)
-        edge_y.append(y1)
-        edge_y.append(None)
+def get_layout(graph):
+    """
+        Returns array of node positions in order of graph.nodes(), computed once for every distinct graph.
+    """
+    key = graph_hash(graph)
+    positions = _layouts.get(key)
+    if positions is not None:
+        return positions
 
-    edge_trace = go.Scatter(
-        x=edge_x, y=edge_y,
+    layout_path = f"{layout_folder}/{key}.npy"
+    if os.path.isfile(layout_path):
+        positions = np.load(layout_path)
+    else:
+        pos = nx.spring_layout(graph, seed=LAYOUT_SEED)
+        positions = np.array([pos[node] for node in graph.nodes()], dtype=np.float64).reshape(-1, 2)
+        if not os.path.isdir(layout_folder):
+            os.makedirs(layout_folder)
+        np.save(layout_path, positions)
+
+    _layouts[key] = positions
+    return positions
+
+
+def graph_figure(graph, prob, startNode, start_probability, webgl=None, top_k=None, max_edges=MAX_EDGES):
+    """
+        Builds the figure drawn by draw_graph. prob maps nodes to probabilities, or is an array in order of
+        graph.nodes().
+    """
+    nodes = list(graph.nodes())
+    index = {node: position for position, node in enumerate(nodes)}
+    positions = get_layout(graph)
+    if webgl is None:
+        webgl = len(nodes) > WEBGL_NODE_COUNT
+    scatter = go.Scattergl if webgl else go.Scatter
+
+    if hasattr(prob, "items"):
+        probabilities = np.array([prob.get(node, 0) for node in nodes], dtype=np.float64)
+    else:
+        probabilities = np.asarray(prob, dtype=np.float64)
+    colors = probabilities.copy()
+    if startNode in index:
+        colors[index[startNode]] = start_probability
+
+    if top_k is not None and top_k < len(nodes):
+        shown, _ = top_k_nodes(probabilities, top_k)
+        if startNode in index and index[startNode] not in shown:
+            shown = np.append(shown, index[startNode])
+        shown = np.sort(shown)
+    else:
+        shown = np.arange(len(nodes))
+
+    edges = np.array([(index[u], index[v]) for u, v in graph.edges()], dtype=np.int64).reshape(-1, 2)
+    is_shown = np.zeros(len(nodes), dtype=bool)
+    is_shown[shown] = True
+    edges = edges[is_shown[edges[:, 0]] & is_shown[edges[:, 1]]]
+    if len(edges) > max_edges:
+        edge_probabilities = probabilities[edges[:, 0]] + probabilities[edges[:, 1]]
+        edges = edges[np.sort(np.argsort(-edge_probabilities, kind="stable")[:max_edges])]
+
+    # Every edge is drawn as start, end and a gap, so all edges fit in one trace
+    edge_x = np.full((len(edges), 3), np.nan)
+    edge_y = np.full((len(edges), 3), np.nan)
+    edge_x[:, :2] = positions[edges, 0]
+    edge_y[:, :2] = positions[edges, 1]
+
+    edge_trace = scatter(
+        x=edge_x.ravel(), y=edge_y.ravel(),
         line=dict(width=0.5, color='#444'),
         hoverinfo='none',
         mode='lines')
 
-    node_x = []
-    node_y = []
-    for node in graph.nodes():
-        x, y = pos[node]
-        node_x.append(x)
-        node_y.append(y)
-
-    node_trace = go.Scatter(
-        x=node_x, y=node_y,
+    node_trace = scatter(
+        x=positions[shown, 0], y=positions[shown, 1],
         mode='markers',
         hoverinfo='text',
+        text=[f'Probability: {probability}' for probability in probabilities[shown].tolist()],
         marker=dict(
             showscale=True,
             colorscale='Reds',
             reversescale=False,
-            color=[],
+            color=colors[shown],
             size=10,
             colorbar=dict(
                 thickness=15,
-                title='Probability',
-                xanchor='left',
-                titleside='right'
+                title=dict(text='Probability', side='right'),
+                xanchor='left'
             ),
             line_width=2))
 
-    node_probs = []
-    node_text = []
-    for node, probability in prob.items():
-        if startNode == node:
-            node_probs.append(start_probability)
-        else:
-            node_probs.append(probability)
-        node_text.append('Probability: ' + str(probability))
+    # noinspection PyTypeChecker
+    return go.Figure(data=[edge_trace, node_trace],
+                     layout=go.Layout(
+                         title=dict(text=f"Node probabilities for graph with {graph.number_of_nodes()} nodes",
+                                    font=dict(family="Open Sans", size=25)),
+                         showlegend=False,
+                         hovermode='closest',
+                         margin=dict(b=20, l=5, r=5, t=40),
+                         xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
+                         yaxis=dict(showgrid=False, zeroline=False, showticklabels=False))
+                     )
 
-    node_trace.marker.color = node_probs
-    node_trace.text = node_text
 
-    # noinspection PyTypeChecker
-    fig = go.Figure(data=[edge_trace, node_trace],
-                    layout=go.Layout(
-                        title=f"Node probabilities for graph with {graph.number_of_nodes()} nodes",
-                        titlefont_family="Open Sans",
-                        titlefont_size=25,
-                        showlegend=False,
-                        hovermode='closest',
-                        margin=dict(b=20, l=5, r=5, t=40),
-                        xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
-                        yaxis=dict(showgrid=False, zeroline=False, showticklabels=False))
-                    )
-
-    folder_path = get_project_root() + "/Visualization"
+def draw_graph(graph, prob, name, startNode, start_probability, webgl=None, top_k=None, max_edges=MAX_EDGES):
+    fig = graph_figure(graph, prob, startNode, start_probability, webgl, top_k, max_edges)
+
     # Crete folder if it does not exist
     if not os.path.isdir(folder_path):
         os.mkdir(folder_path)
@@ -0,0 +1,152 @@
+"""
+
+    Used for generating large synthetic networks for performance testing.
+
+    Graphs are built directly as sparse CSR matrices with integer edge weights between 1 and MAX_WEIGHT, never as
+    dense matrices or networkx objects, so networks with 10^5 - 10^6 nodes take seconds. Every generator takes a seed
+    and returns the same graph for the same arguments.
+
+    Topologies:
+        geometric   - nodes at random points of the unit square, connected when closer than radius, same model
+                      as networkx random_geometric_graph (pairs found with a k-d tree)
+        scale_free  - every new node attaches to edges_per_node older nodes chosen with the attachment probabilities
+                      of the Barabasi-Albert model, so degrees follow a power law with exponent 3
+        ppi         - Chung-Lu graph with expected degrees drawn from a power law with exponential cut-off, the
+                      degree distribution usually fitted to protein-protein interaction networks
+
+    Function generate_graphs writes many graphs into '.csr' files (see src/util/graph_io.py) using several
+    processes, each graph generated from its own seed.
+
+    Usage:
+        python -m src.util.generate --topology ppi --nodes 100000 1000000 [--folder FOLDER] [--seed 0]
+
+"""
+import argparse
+import multiprocessing
+import os.path
+import sys
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.spatial import cKDTree
+
+from src.algorithm.graph import to_csr
+from src.util.console import *
+from src.util.graph_io import GRAPH_EXTENSION, write_graph
+from src.util.path import *
+
+MAX_WEIGHT = 20
+
+
+def _to_graph(rng, node_count, edges):
+    # Self loops and repeated edges are dropped, every remaining edge gets a random weight in both directions
+    edges = np.sort(edges, axis=1)
+    keys = np.unique(edges[edges[:, 0] != edges[:, 1]] @ np.array([node_count, 1], dtype=np.int64))
+    edges = np.column_stack((keys // node_count, keys % node_count))
+    weights = rng.integers(1, MAX_WEIGHT + 1, len(edges))
+    rows = np.concatenate((edges[:, 0], edges[:, 1]))
+    columns = np.concatenate((edges[:, 1], edges[:, 0]))
+    return to_csr(sp.csr_matrix((np.concatenate((weights, weights)), (rows, columns)),
+                                shape=(node_count, node_count)))
+
+
+def geometric_graph(node_count, radius, seed=0):
+    rng = np.random.default_rng(seed)
+    positions = rng.random((node_count, 2))
+    edges = cKDTree(positions).query_pairs(radius, output_type="ndarray")
+    return _to_graph(rng, node_count, edges.reshape(-1, 2))
+
+
+def scale_free_graph(node_count, edges_per_node=2, seed=0):
+    """
+        In the Barabasi-Albert model the expected degree of node j when node i arrives is proportional to
+        sqrt(i / j), so i attaches to j with density proportional to j^(-1/2), which is the density of floor(i * u^2)
+        for u uniform on [0, 1). This draws all attachments at once instead of updating degrees node by node.
+    """
+    rng = np.random.default_rng(seed)
+    new_nodes = np.repeat(np.arange(1, node_count, dtype=np.int64), edges_per_node)
+    targets = (new_nodes * rng.random(len(new_nodes)) ** 2).astype(np.int64)
+    return _to_graph(rng, node_count, np.column_stack((new_nodes, targets)))
+
+
+def ppi_graph(node_count, mean_degree=7, exponent=2.4, cutoff=None, seed=0):
+    """
+        Expected degrees follow k^(-exponent) * exp(-k / cutoff), scaled to mean_degree. Edge end points are drawn
+        with probability proportional to expected degree, and repeated edges are dropped.
+    """
+    rng = np.random.default_rng(seed)
+    if cutoff is None:
+        cutoff = max(np.sqrt(node_count), mean_degree * 10)
+    # Power law sampled by inverse transform, exponential cut-off applied by rejection
+    expected_degrees = np.empty(0)
+    while len(expected_degrees) < node_count:
+        samples = (1 - rng.random(node_count)) ** (-1 / (exponent - 1))
+        samples = samples[rng.random(node_count) < np.exp(-samples / cutoff)]
+        expected_degrees = np.concatenate((expected_degrees, samples))
+    expected_degrees = expected_degrees[:node_count]
+
+    edge_count = int(round(node_count * mean_degree / 2))
+    end_points = rng.choice(node_count, size=(edge_count, 2), p=expected_degrees / expected_degrees.sum())
+    return _to_graph(rng, node_count, end_points)
+
+
+TOPOLOGIES = {
+    "geometric": lambda node_count, seed: geometric_graph(node_count, np.sqrt(10 / (np.pi * node_count)), seed),
+    "scale_free": lambda node_count, seed: scale_free_graph(node_count, seed=seed),
+    "ppi": lambda node_count, seed: ppi_graph(node_count, seed=seed),
+}
+
+
+def generate_graph(topology, node_count, seed=0):
+    """
+        Generates a graph of the given topology with default parameters, about 10 neighbours per node for geometric
+        graphs, 4 for scale free and 7 for PPI-like graphs.
+    """
+    return TOPOLOGIES[topology](node_count, seed)
+
+
+def graph_name(topology, node_count, seed=0):
+    return f"{topology}_{node_count}_nodes_seed_{seed}"
+
+
+def _write_generated(arguments):
+    topology, node_count, seed, path = arguments
+    write_graph(path, generate_graph(topology, node_count, seed))
+    return path
+
+
+def generate_graphs(specifications, folder, processes=None):
+    """
+        Writes a graph for every (topology, node count, seed) into folder and returns the paths. Graphs are
+        generated in parallel by processes workers.
+    """
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+    tasks = [(topology, node_count, seed, f"{folder}/{graph_name(topology, node_count, seed)}{GRAPH_EXTENSION}")
+             for topology, node_count, seed in specifications]
+    if processes == 1 or len(tasks) <= 1:
+        return [_write_generated(task) for task in tasks]
+    with multiprocessing.Pool(processes) as pool:
+        return pool.map(_write_generated, tasks)
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic networks in '.csr' format.")
+    parser.add_argument("--topology", nargs="+", choices=list(TOPOLOGIES), default=list(TOPOLOGIES))
+    parser.add_argument("--nodes", nargs="+", type=int, required=True)
+    parser.add_argument("--seed", nargs="+", type=int, default=[0])
+    parser.add_argument("--folder", default=get_project_root() + "/test/data/generated")
+    parser.add_argument("--processes", type=int)
+    arguments = parser.parse_args(arguments)
+
+    write_header_message("Generating graphs:")
+    specifications = [(topology, node_count, seed) for topology in arguments.topology
+                      for node_count in arguments.nodes for seed in arguments.seed]
+    for path in generate_graphs(specifications, arguments.folder, arguments.processes):
+        write_normal_message(f"    {relative_path(path)}")
+    write_success_message("SUCCESS - Graphs generated")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
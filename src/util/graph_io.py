@@ -0,0 +1,163 @@
+"""
+
+    Used for storing graphs in a compact binary format which can be memory-mapped.
+
+    A graph file holds the CSR arrays of the adjacency matrix one after another, preceded by a fixed size header:
+
+        magic (8 bytes) | node count (int64) | edge count (int64) | indices dtype (8 bytes) | weights dtype (8 bytes)
+
+    followed by indptr (int64, node count + 1 values), indices and weights, each starting at an offset aligned to
+    8 bytes. Function load_graph reads only the header and maps the arrays from the file without reading or
+    copying them. The DiffusionGraph built on them computes degrees when asked and caches rows only of nodes
+    diffusion reaches, so loading takes the same time for any graph size and only the parts of the arrays touched
+    by diffusion are ever read.
+
+    Function read_csv_graph streams an adjacency matrix CSV into a CSR matrix chunk by chunk, so graphs too large
+    for a dense DataFrame can still be read, converted or passed directly to the diffusion functions. Function
+    write_csv_graph writes the same format from a sparse matrix without building the dense matrix.
+
+    Running this module converts every 'graph_*.csv' in the given folder (test/data/graph by default) into a
+    '.csr' file next to it.
+
+"""
+import glob
+import itertools
+import os.path
+import sys
+
+import numpy as np
+import scipy.sparse as sp
+
+from src.algorithm.graph import DiffusionGraph, to_csr
+from src.util.console import *
+from src.util.path import *
+
+MAGIC = b"CTDCSR01"
+HEADER_SIZE = 64
+GRAPH_EXTENSION = ".csr"
+
+
+def _aligned(offset):
+    return (offset + 7) // 8 * 8
+
+
+def _layout(node_count, edge_count, indices_dtype, weights_dtype):
+    indptr_offset = HEADER_SIZE
+    indices_offset = _aligned(indptr_offset + (node_count + 1) * 8)
+    weights_offset = _aligned(indices_offset + edge_count * indices_dtype.itemsize)
+    end = weights_offset + edge_count * weights_dtype.itemsize
+    return indptr_offset, indices_offset, weights_offset, end
+
+
+def write_graph(path, adj_mat):
+    matrix = to_csr(adj_mat)
+    node_count, edge_count = matrix.shape[0], matrix.nnz
+    indptr = matrix.indptr.astype("<i8")
+    indices = matrix.indices.astype("<i4" if node_count < 2 ** 31 else "<i8")
+    weights = matrix.data.astype(matrix.data.dtype.newbyteorder("<"))
+
+    header = MAGIC + np.array([node_count, edge_count], dtype="<i8").tobytes() + \
+        indices.dtype.str.encode().ljust(8) + weights.dtype.str.encode().ljust(8)
+    indptr_offset, indices_offset, weights_offset, _ = _layout(node_count, edge_count, indices.dtype, weights.dtype)
+
+    with open(path, "wb") as file:
+        file.write(header.ljust(HEADER_SIZE, b"\0"))
+        for offset, array in ((indptr_offset, indptr), (indices_offset, indices), (weights_offset, weights)):
+            file.write(b"\0" * (offset - file.tell()))
+            file.write(array.tobytes())
+
+
+def load_graph(path):
+    with open(path, "rb") as file:
+        header = file.read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE or header[:8] != MAGIC:
+        raise ValueError(f"\'{path}\' is not a graph file")
+
+    node_count, edge_count = np.frombuffer(header, dtype="<i8", count=2, offset=8).tolist()
+    indices_dtype = np.dtype(header[24:32].rstrip().decode())
+    weights_dtype = np.dtype(header[32:40].rstrip().decode())
+    indptr_offset, indices_offset, weights_offset, _ = _layout(node_count, edge_count, indices_dtype, weights_dtype)
+
+    indptr = np.memmap(path, dtype="<i8", mode="r", offset=indptr_offset, shape=(node_count + 1,))
+    indices = _map_array(path, indices_dtype, indices_offset, edge_count)
+    weights = _map_array(path, weights_dtype, weights_offset, edge_count)
+    return DiffusionGraph(indptr, indices, weights)
+
+
+def _map_array(path, dtype, offset, length):
+    # Empty arrays can not be memory-mapped
+    if length == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(length,))
+
+
+def read_csv_graph(csv_path, dtype=np.int64, chunk_bytes=2 ** 26):
+    """
+        Reads an adjacency matrix CSV, as written by DataFrame.to_csv(index=False), into a CSR matrix without
+        building the dense matrix. Rows are parsed in chunks of at most chunk_bytes and only their positive entries
+        are kept, so memory used is bounded by the chunk size plus the size of the sparse result.
+    """
+    indices_chunks = []
+    weights_chunks = []
+    row_counts = []
+    with open(csv_path) as file:
+        node_count = len(file.readline().split(","))
+        chunk_rows = max(1, chunk_bytes // (node_count * np.dtype(dtype).itemsize))
+        while True:
+            lines = list(itertools.islice(file, chunk_rows))
+            if len(lines) == 0:
+                break
+            block = np.loadtxt(lines, delimiter=",", dtype=dtype, ndmin=2)
+            if block.shape[1] != node_count:
+                raise ValueError(f"Rows of \'{csv_path}\' have {block.shape[1]} values, header has {node_count}")
+            rows, columns = np.nonzero(block > 0)
+            indices_chunks.append(columns.astype(np.int32 if node_count < 2 ** 31 else np.int64))
+            weights_chunks.append(block[rows, columns])
+            row_counts.append(np.bincount(rows, minlength=len(lines)))
+
+    counts = np.concatenate(row_counts) if row_counts else np.zeros(0, dtype=np.int64)
+    if len(counts) != node_count:
+        raise ValueError(f"\'{csv_path}\' has {len(counts)} rows, header has {node_count} columns")
+    indptr = np.concatenate(([0], np.cumsum(counts)))
+    indices = np.concatenate(indices_chunks) if indices_chunks else np.zeros(0, dtype=np.int32)
+    weights = np.concatenate(weights_chunks) if weights_chunks else np.zeros(0, dtype=dtype)
+    return sp.csr_matrix((weights, indices, indptr), shape=(node_count, node_count))
+
+
+def write_csv_graph(csv_path, adj_mat):
+    """
+        Writes an adjacency matrix CSV in the format of DataFrame.to_csv(index=False), with nodes numbered from 0 as
+        column names. Every row is written from its non-zero entries, filled in a copy of a row of zeros.
+    """
+    matrix = to_csr(adj_mat)
+    node_count = matrix.shape[0]
+    to_text = str if np.issubdtype(matrix.dtype, np.integer) else repr
+    zeros = [to_text(matrix.dtype.type(0).item())] * node_count
+    indptr, indices = matrix.indptr.tolist(), matrix.indices.tolist()
+    values = list(map(to_text, matrix.data.tolist()))
+    with open(csv_path, "w") as file:
+        file.write(",".join(str(node) for node in range(node_count)) + "\n")
+        for node in range(node_count):
+            row = zeros.copy()
+            for position in range(indptr[node], indptr[node + 1]):
+                row[indices[position]] = values[position]
+            file.write(",".join(row) + "\n")
+
+
+def convert_csv_graph(csv_path, graph_path=None):
+    if graph_path is None:
+        graph_path = os.path.splitext(csv_path)[0] + GRAPH_EXTENSION
+    write_graph(graph_path, read_csv_graph(csv_path))
+    return graph_path
+
+
+def convert_csv_graphs(folder):
+    write_header_message("Converting test graphs:")
+    for csv_path in sorted(glob.glob(f"{folder}/graph_*.csv")):
+        graph_path = convert_csv_graph(csv_path)
+        write_normal_message(f"\'{relative_path(csv_path)}\' -> \'{relative_path(graph_path)}\'")
+    write_success_message("SUCCESS - Test graphs converted")
+
+
+if __name__ == "__main__":
+    convert_csv_graphs(sys.argv[1] if len(sys.argv) > 1 else get_project_root() + "/test/data/graph")
@@ -0,0 +1,329 @@
+"""
+
+    Long running diffusion service, so queries do not pay for starting Python and reading the graph every time.
+
+    DiffusionServer keeps named graphs loaded as DiffusionGraph instances and listens on a Unix socket or on a
+    localhost TCP port. Requests and responses are JSON objects, one per line:
+
+        {"id": 1, "op": "diffuse", "graph": "ppi", "sources": [[sn, p1], ...], "alpha": 0.5, "threshold": 0.01}
+        {"id": 2, "op": "load", "name": "ppi", "path": "/data/ppi.csr"}
+        {"id": 3, "op": "graphs"}
+
+    A diffuse response holds one row of node probabilities per source. With "top_k": k only the k most probable
+    nodes of each row are returned, and with "format": "binary" the rows are sent as raw little-endian floats
+    ("dtype" float64 or float32) following a JSON header line which gives their shape and size in bytes. Failed
+    requests get {"id": ..., "error": message}. A request line longer than max_request_size bytes is skipped and
+    answered with {"id": null, "error": message}, and the connection stays open.
+
+    Diffuse requests for the same graph, alpha and threshold which arrive within batch_delay seconds of each other
+    are run together as one DIFFUSE_PROB_BATCH call in a worker thread, so they share neighbour lookups and the event
+    loop keeps accepting requests meanwhile. A batch is started early once it holds max_batch_size sources.
+
+    DiffusionClient is a blocking client for scripts and pipelines.
+
+    Usage:
+        python -m src.util.service (--socket PATH | --port PORT) [--graph NAME=PATH ...]
+
+"""
+import argparse
+import asyncio
+import json
+import socket
+import sys
+
+import numpy as np
+
+from src.algorithm.batch import DIFFUSE_PROB_BATCH
+from src.algorithm.ctd import THRESHOLD_DIFF
+from src.algorithm.graph import as_diffusion_graph
+from src.algorithm.result import top_k as top_k_nodes
+from src.util.console import *
+from src.util.graph_io import GRAPH_EXTENSION, load_graph, read_csv_graph
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+BATCH_DELAY = 0.005
+MAX_BATCH_SIZE = 256
+MAX_REQUEST_SIZE = 2 ** 26
+RESULT_DTYPES = {"float64": "<f8", "float32": "<f4"}
+
+
+class DiffusionServiceError(Exception):
+    pass
+
+
+def read_graph(path):
+    if path.endswith(GRAPH_EXTENSION):
+        return load_graph(path)
+    return as_diffusion_graph(read_csv_graph(path))
+
+
+class DiffusionServer:
+
+    def __init__(self, graphs=None, batch_delay=BATCH_DELAY, max_batch_size=MAX_BATCH_SIZE,
+                 max_request_size=MAX_REQUEST_SIZE):
+        self.graphs = {}
+        self.batch_delay = batch_delay
+        self.max_batch_size = max_batch_size
+        self.max_request_size = max_request_size
+        self.batches = 0
+        # (graph name, alpha, threshold) -> list of (sources, future) waiting for the next batch
+        self._pending = {}
+        # (graph name, alpha, threshold) -> timer which starts the pending batch
+        self._timers = {}
+        self._server = None
+        for name, graph in (graphs or {}).items():
+            self.add_graph(name, graph)
+
+    def add_graph(self, name, adj_mat):
+        """
+            Adds a graph given as a path to a '.csr' or CSV file, or as any adjacency supported by the diffusion
+            functions.
+        """
+        self.graphs[name] = read_graph(adj_mat) if isinstance(adj_mat, str) else as_diffusion_graph(adj_mat)
+
+    async def start(self, path=None, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        if path is not None:
+            self._server = await asyncio.start_unix_server(self._handle_connection, path,
+                                                           limit=self.max_request_size)
+        else:
+            self._server = await asyncio.start_server(self._handle_connection, host, port,
+                                                      limit=self.max_request_size)
+        return self._server
+
+    async def serve_forever(self, path=None, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        server = await self.start(path, host, port)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+
+    async def diffuse(self, name, sources, alpha=0.5, threshold=THRESHOLD_DIFF):
+        """
+            Returns array with one row of node probabilities per (sn, p1) source, computed in a batch together with
+            other requests for the same graph and parameters.
+        """
+        graph = self.graphs.get(name)
+        if graph is None:
+            raise DiffusionServiceError(f"Unknown graph \'{name}\'")
+        sources = [(int(sn), float(p1)) for sn, p1 in sources]
+        for sn, _ in sources:
+            if not 0 <= sn < graph.node_count:
+                raise DiffusionServiceError(f"Node {sn} is not in graph \'{name}\' with {graph.node_count} nodes")
+
+        loop = asyncio.get_running_loop()
+        key = (name, alpha, threshold)
+        future = loop.create_future()
+        pending = self._pending.setdefault(key, [])
+        pending.append((sources, future))
+        if len(pending) == 1:
+            self._timers[key] = loop.call_later(self.batch_delay, self._flush, key)
+        if sum(len(request_sources) for request_sources, _ in pending) >= self.max_batch_size:
+            self._flush(key)
+        return await future
+
+    def _flush(self, key):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(key, None)
+        if batch:
+            asyncio.ensure_future(self._run_batch(key, batch))
+
+    async def _run_batch(self, key, batch):
+        name, alpha, threshold = key
+        sources = [source for request_sources, _ in batch for source in request_sources]
+        self.batches += 1
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(
+                None, DIFFUSE_PROB_BATCH, sources, self.graphs[name], alpha, threshold)
+        except Exception as error:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        start = 0
+        for request_sources, future in batch:
+            if not future.done():
+                future.set_result(result[start:start + len(request_sources)])
+            start += len(request_sources)
+
+    async def _handle_connection(self, reader, writer):
+        lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readuntil(b"\n")
+                except asyncio.IncompleteReadError as error:
+                    # Last request may end without a newline
+                    line = error.partial
+                except asyncio.LimitOverrunError as error:
+                    await self._skip_line(reader, error.consumed)
+                    await self._write(writer, lock, {
+                        "id": None, "error": f"Request is longer than {self.max_request_size} bytes"})
+                    continue
+                if not line:
+                    break
+                task = asyncio.ensure_future(self._handle_request(line, writer, lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _skip_line(reader, consumed):
+        # Bytes before the newline are dropped in parts of at most the reader limit
+        while True:
+            await reader.readexactly(consumed)
+            try:
+                await reader.readuntil(b"\n")
+                return
+            except asyncio.IncompleteReadError:
+                return
+            except asyncio.LimitOverrunError as error:
+                consumed = error.consumed
+
+    @staticmethod
+    async def _write(writer, lock, header, payload=b""):
+        async with lock:
+            writer.write(json.dumps(header).encode() + b"\n" + payload)
+            await writer.drain()
+
+    async def _handle_request(self, line, writer, lock):
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            header, payload = await self._respond(request)
+        except Exception as error:
+            header, payload = {"error": str(error)}, b""
+        header["id"] = request_id
+        await self._write(writer, lock, header, payload)
+
+    async def _respond(self, request):
+        operation = request.get("op")
+        if operation == "graphs":
+            return {"result": {name: graph.node_count for name, graph in self.graphs.items()}}, b""
+
+        if operation == "load":
+            graph = await asyncio.get_running_loop().run_in_executor(None, read_graph, request["path"])
+            self.graphs[request["name"]] = graph
+            return {"result": {"nodes": graph.node_count}}, b""
+
+        if operation != "diffuse":
+            raise DiffusionServiceError(f"Unknown operation \'{operation}\'")
+
+        result = await self.diffuse(request["graph"], request["sources"], request.get("alpha", 0.5),
+                                    request.get("threshold", THRESHOLD_DIFF))
+        if request.get("top_k") is not None:
+            ranked = [top_k_nodes(row, request["top_k"]) for row in result]
+            return {"result": [[nodes.tolist(), probabilities.tolist()] for nodes, probabilities in ranked]}, b""
+        if request.get("format") == "binary":
+            dtype = RESULT_DTYPES[request.get("dtype", "float64")]
+            payload = result.astype(dtype).tobytes()
+            return {"shape": list(result.shape), "dtype": dtype, "size": len(payload)}, payload
+        return {"result": result.tolist()}, b""
+
+
+class DiffusionClient:
+    """
+        Blocking client of DiffusionServer, connects to a Unix socket if path is given and to host and port
+        otherwise. Requests are sent one at a time.
+    """
+
+    def __init__(self, path=None, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=None):
+        if path is not None:
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._socket.settimeout(timeout)
+            self._socket.connect(path)
+        else:
+            self._socket = socket.create_connection((host, port), timeout)
+        self._file = self._socket.makefile("rwb")
+        self._next_id = 0
+
+    def _request(self, request):
+        self._next_id += 1
+        request["id"] = self._next_id
+        self._file.write(json.dumps(request).encode() + b"\n")
+        self._file.flush()
+
+        line = self._file.readline()
+        if not line:
+            raise DiffusionServiceError("Connection closed by server")
+        header = json.loads(line)
+        if "error" in header:
+            raise DiffusionServiceError(header["error"])
+        if "size" in header:
+            payload = self._file.read(header["size"])
+            return np.frombuffer(payload, dtype=header["dtype"]).reshape(header["shape"])
+        return header["result"]
+
+    def diffuse(self, graph, sources, alpha=0.5, threshold=THRESHOLD_DIFF, dtype="float64"):
+        """
+            Returns array with one row of node probabilities per (sn, p1) source.
+        """
+        return self._request({"op": "diffuse", "graph": graph, "sources": [[int(sn), float(p1)] for sn, p1 in sources],
+                              "alpha": alpha, "threshold": threshold, "format": "binary", "dtype": dtype})
+
+    def top_k(self, graph, sources, k, alpha=0.5, threshold=THRESHOLD_DIFF):
+        """
+            Returns (nodes, probabilities) of the k most probable nodes for every (sn, p1) source.
+        """
+        result = self._request({"op": "diffuse", "graph": graph, "sources": [[int(sn), float(p1)] for sn, p1 in sources],
+                                "alpha": alpha, "threshold": threshold, "top_k": k})
+        return [(np.array(nodes, dtype=np.int64), np.array(probabilities)) for nodes, probabilities in result]
+
+    def load_graph(self, name, path):
+        return self._request({"op": "load", "name": name, "path": path})["nodes"]
+
+    def graphs(self):
+        return self._request({"op": "graphs"})
+
+    def close(self):
+        self._file.close()
+        self._socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Serve probability diffusion over a local socket.")
+    parser.add_argument("--socket", help="path of the Unix socket to listen on")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--graph", action="append", default=[], metavar="NAME=PATH",
+                        help="graph loaded at start, from a '.csr' or CSV file")
+    parser.add_argument("--batch-delay", type=float, default=BATCH_DELAY,
+                        help="seconds a request waits for others to join its batch")
+    parser.add_argument("--max-request-size", type=int, default=MAX_REQUEST_SIZE,
+                        help="longest accepted request line in bytes")
+    arguments = parser.parse_args(arguments)
+
+    server = DiffusionServer(batch_delay=arguments.batch_delay, max_request_size=arguments.max_request_size)
+    write_header_message("Loading graphs:")
+    for graph in arguments.graph:
+        name, _, path = graph.partition("=")
+        server.add_graph(name, path)
+        write_normal_message(f"    {name}: {server.graphs[name].node_count} nodes")
+
+    address = arguments.socket if arguments.socket is not None else f"{arguments.host}:{arguments.port}"
+    write_success_message(f"Listening on {address}")
+    try:
+        asyncio.run(server.serve_forever(arguments.socket, arguments.host, arguments.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
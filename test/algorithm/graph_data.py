@@ -0,0 +1,22 @@
+"""
+
+    Used for reading the test graphs in test/data/graph, shared by the algorithm tests.
+
+"""
+import pandas as pd
+
+from src.algorithm.graph import *
+from src.util.path import *
+
+data_folder = get_project_root() + "/test/data/graph"
+
+
+def read_dataframe(name):
+    df = pd.read_csv(f"{data_folder}/{name}", dtype=int)
+    df.columns = df.columns.astype(int)
+    return df
+
+
+def read_graph(name):
+    df = read_dataframe(name)
+    return as_diffusion_graph(df), len(df)
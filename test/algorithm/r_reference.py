@@ -0,0 +1,108 @@
+"""
+
+    Used for storing results of the R implementation of probability diffusion (src/R/graph.diffuseP1.r), so that
+    R is started only for inputs that were never seen before.
+
+    Every result is kept in test/data/reference as a JSON file named by the SHA-256 hash of the graph file content,
+    starting node, p1, threshold and the R sources. Changing any of them leads to a new reference result, while
+    unchanged inputs are read from disk without loading rpy2.
+
+"""
+import hashlib
+import json
+import os.path
+
+import pandas as pd
+
+from src.util.path import *
+
+R_files_location = get_project_root() + '/src/R'
+R_FILES = ['graph.diffuseP1.r', 'graph.connectToExt.r']
+
+reference_folder = get_project_root() + "/test/data/reference"
+
+# R function, sourced on first use
+_R_function = None
+
+
+def reference_key(graph_path, sn, p1, threshold):
+    digest = hashlib.sha256()
+    with open(graph_path, 'rb') as file:
+        digest.update(file.read())
+    for name in R_FILES:
+        with open(f'{R_files_location}/{name}', 'rb') as file:
+            digest.update(file.read())
+    digest.update(json.dumps([sn, p1, threshold]).encode())
+    return digest.hexdigest()
+
+
+def get_reference(graph_path, sn, p1, threshold):
+    """
+        Returns list of probabilities computed by R for every node, or None if the result is not stored and R is
+        not available.
+    """
+    reference_path = f"{reference_folder}/{reference_key(graph_path, sn, p1, threshold)}.json"
+    if os.path.isfile(reference_path):
+        with open(reference_path) as file:
+            return json.load(file)["probabilities"]
+
+    probabilities = _run_R_function(graph_path, sn, p1, threshold)
+    if probabilities is None:
+        return None
+
+    if not os.path.isdir(reference_folder):
+        os.mkdir(reference_folder)
+    with open(reference_path, 'w') as file:
+        json.dump({
+            "graph": relative_path(graph_path),
+            "sn": sn,
+            "p1": p1,
+            "threshold": threshold,
+            "probabilities": probabilities,
+        }, file)
+    return probabilities
+
+
+def _run_R_function(graph_path, sn, p1, threshold):
+    global _R_function
+    try:
+        import rpy2.robjects as ro
+        from rpy2.robjects import pandas2ri
+        from rpy2.robjects.conversion import localconverter
+    except ImportError:
+        return None
+
+    if _R_function is None:
+        for name in R_FILES:
+            ro.r['source'](f'{R_files_location}/{name}')
+        _R_function = ro.globalenv['graph.diffuseP1']
+
+    df = pd.read_csv(graph_path, dtype=int)
+    with localconverter(ro.default_converter + pandas2ri.converter):  # Convert data
+        df_r = ro.conversion.py2rpy(df)
+    # R uses indexes starting from 1
+    response = _R_function(p1, sn + 1, threshold, df_r)
+    return [response[node][0] for node in range(len(df))]
+
+
+def get_connect_to_ext_reference(matrix, sn, visited_nodes):
+    """
+        Returns adjacency matrix computed by graph.connectToExt as a NumPy array indexed by original node, with nodes
+        the R function dropped left without edges, or None if R is not available.
+    """
+    try:
+        import numpy as np
+        import rpy2.robjects as ro
+    except ImportError:
+        return None
+
+    ro.r['source'](f'{R_files_location}/graph.connectToExt.r')
+    names = [str(node) for node in range(len(matrix))]
+    r_matrix = ro.r['matrix'](ro.FloatVector(np.asarray(matrix, dtype=float).flatten(order='F')),
+                              nrow=len(matrix), dimnames=ro.r['list'](ro.StrVector(names), ro.StrVector(names)))
+    response = ro.globalenv['graph.connectToExt'](r_matrix, str(sn), ro.StrVector([str(node) for node in visited_nodes]))
+
+    kept = [int(name) for name in ro.r['rownames'](response)]
+    result = np.zeros((len(matrix), len(matrix)))
+    result[np.ix_(kept, kept)] = np.array(response)
+    return result
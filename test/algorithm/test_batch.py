@@ -0,0 +1,70 @@
+"""
+
+    Used for testing of batched CTD (Connect the dots) probability diffusion
+
+"""
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.algorithm.batch import *
+from src.algorithm.ctd import *
+from src.util.path import *
+
+STARTING_PROBABILITY = 0.5
+
+data_folder = get_project_root() + "/test/data/graph"
+
+
+def diffuse_separately(sources, adj_mat, node_count):
+    results = []
+    for sn, p1 in sources:
+        probabilities = {node: 0 for node in range(node_count)}
+        probabilities[sn] = p1
+        DIFFUSE_PROB_ITERATIVE(p1, sn, probabilities, adj_mat)
+        results.append([probabilities[node] for node in range(node_count)])
+    return np.array(results)
+
+
+class TestBatch(unittest.TestCase):
+
+    def test_batch_matches_separate_calls(self):
+        for name in ["graph_10_nodes.csv", "graph_50_nodes_0.25_probability.csv", "graph_50_nodes_0.9_probability.csv"]:
+            with self.subTest(name):
+                df = pd.read_csv(f"{data_folder}/{name}", dtype=int)
+                df.columns = df.columns.astype(int)
+                node_count = len(df)
+                sources = [(sn, STARTING_PROBABILITY) for sn in range(node_count)]
+
+                response = DIFFUSE_PROB_BATCH(sources, df)
+
+                self.assertEqual(response.shape, (node_count, node_count))
+                np.testing.assert_array_equal(response, diffuse_separately(sources, df, node_count))
+
+    def test_batch_with_starting_distributions(self):
+        df = pd.read_csv(f"{data_folder}/graph_10_nodes.csv", dtype=int)
+        distributions = np.zeros((3, 10))
+        distributions[0, 0] = STARTING_PROBABILITY
+        distributions[1, 4] = 1
+        distributions[2, 2] = STARTING_PROBABILITY
+
+        response = DIFFUSE_PROB_BATCH(distributions, df)
+
+        expected = diffuse_separately([(0, STARTING_PROBABILITY), (4, 1), (2, STARTING_PROBABILITY)], df, 10)
+        np.testing.assert_array_equal(response, expected)
+
+    def test_repeated_sources(self):
+        df = pd.read_csv(f"{data_folder}/graph_50_nodes_0.5_probability.csv", dtype=int)
+        sources = [(3, STARTING_PROBABILITY), (8, 1), (3, STARTING_PROBABILITY), (3, 1)]
+
+        response = DIFFUSE_PROB_BATCH(sources, df)
+
+        np.testing.assert_array_equal(response, diffuse_separately(sources, df, 50))
+        # Results of repeated sources are separate rows, not views of one row
+        response[0, 0] += 1
+        self.assertNotEqual(response[0, 0], response[2, 0])
+
+
+if __name__ == "__main__":
+    unittest.main()
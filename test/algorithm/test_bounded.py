@@ -0,0 +1,73 @@
+"""
+
+    Used for testing of CTD (Connect the dots) probability diffusion with bounded work
+
+"""
+import unittest
+
+from src.algorithm.bounded import *
+from src.algorithm.ctd import *
+from src.algorithm.graph import *
+
+# Test graphs of test/data/graph
+from graph_data import *
+
+ALLOWED_DIFFERENCE = 1e-15
+STARTING_PROBABILITY = 0.5
+
+
+def starting_probabilities(node_count, sn_init):
+    probabilities = {node: 0 for node in range(node_count)}
+    probabilities[sn_init] = STARTING_PROBABILITY
+    return probabilities
+
+
+class TestBounded(unittest.TestCase):
+
+    def test_without_budget_matches_iterative(self):
+        graph, node_count = read_graph("graph_50_nodes_0.25_probability.csv")
+        for sn_init in range(node_count):
+            expected = starting_probabilities(node_count, sn_init)
+            DIFFUSE_PROB_ITERATIVE(STARTING_PROBABILITY, sn_init, expected, graph)
+            probabilities = starting_probabilities(node_count, sn_init)
+
+            response = DIFFUSE_PROB_BOUNDED(STARTING_PROBABILITY, sn_init, probabilities, graph)
+
+            self.assertIsNone(response.stopped_by)
+            self.assertEqual(response.unexpanded_probability, 0)
+            for node in expected:
+                self.assertLess(abs(probabilities[node] - expected[node]), ALLOWED_DIFFERENCE)
+
+    def test_expansion_budget(self):
+        graph, node_count = read_graph("graph_10_nodes.csv")
+        expected = starting_probabilities(node_count, 0)
+        DIFFUSE_PROB_ITERATIVE(STARTING_PROBABILITY, 0, expected, graph)
+
+        for max_expansions in [1, 3, 10]:
+            with self.subTest(max_expansions=max_expansions):
+                probabilities = starting_probabilities(node_count, 0)
+                response = DIFFUSE_PROB_BOUNDED(STARTING_PROBABILITY, 0, probabilities, graph,
+                                                max_expansions=max_expansions)
+
+                self.assertLessEqual(response.expansions, max_expansions)
+                # Probability is never lost, it only stays on nodes that were not expanded
+                self.assertAlmostEqual(sum(probabilities.values()), sum(expected.values()), delta=1e-12)
+                error = sum(abs(probabilities[node] - expected[node]) for node in expected)
+                self.assertLessEqual(error, 2 * response.unexpanded_probability + 1e-12)
+
+    def test_memory_and_time_budget(self):
+        graph, node_count = read_graph("graph_50_nodes_0.9_probability.csv")
+
+        probabilities = starting_probabilities(node_count, 0)
+        response = DIFFUSE_PROB_BOUNDED(STARTING_PROBABILITY, 0, probabilities, graph,
+                                        max_memory=FRONTIER_ENTRY_SIZE)
+        self.assertEqual(response.expansions, 1)
+        self.assertEqual(response.stopped_by, "memory")
+
+        probabilities = starting_probabilities(node_count, 0)
+        response = DIFFUSE_PROB_BOUNDED(STARTING_PROBABILITY, 0, probabilities, graph, time_limit=0)
+        self.assertEqual(response.expansions, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
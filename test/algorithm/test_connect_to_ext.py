@@ -0,0 +1,110 @@
+"""
+
+    Used for testing of connecting a node to its extended neighbours in CTD (Connect the dots) algorithm
+
+"""
+import random
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from r_reference import *
+from src.algorithm.connect_to_ext import *
+from src.algorithm.graph import *
+from src.util.path import *
+
+data_folder = get_project_root() + "/test/data/graph"
+
+# Graph from the documentation of graph.connectToExt, nodes A to G
+EXAMPLE_MATRIX = np.array([[0, 2, 1, 0, 0, 0, 0],
+                           [2, 0, 1, 0, 0, 0, 0],
+                           [1, 0, 0, 1, 0, 0, 0],
+                           [0, 0, 1, 0, 2, 0, 0],
+                           [0, 0, 0, 2, 0, 2, 1],
+                           [0, 0, 0, 1, 2, 0, 1],
+                           [0, 0, 0, 0, 1, 1, 0]])
+
+
+def to_dense(graph):
+    indptr, indices, weights = graph.csr_arrays()
+    matrix = np.zeros((graph.node_count, graph.node_count))
+    for node in range(graph.node_count):
+        matrix[node, indices[indptr[node]:indptr[node + 1]]] = weights[indptr[node]:indptr[node + 1]]
+    return matrix
+
+
+class TestConnectToExt(unittest.TestCase):
+
+    def test_documentation_example(self):
+        graph = as_diffusion_graph(EXAMPLE_MATRIX)
+
+        result = CONNECT_TO_EXT(graph, 0, [1, 2])
+
+        expected = EXAMPLE_MATRIX.astype(float)
+        expected[[1, 2], :] = 0
+        expected[:, [1, 2]] = 0
+        expected[0, 3] = expected[3, 0] = 1
+        np.testing.assert_array_equal(to_dense(result), expected)
+        # Given graph stays unchanged
+        np.testing.assert_array_equal(to_dense(graph), EXAMPLE_MATRIX)
+
+    def test_last_neighbour_gives_weight(self):
+        # Node 3 is connected to both neighbours of 0, edge to 2 has the higher index
+        graph = as_diffusion_graph(edge_list_to_csr([(0, 1), (0, 2), (1, 3, 5), (2, 3, 7)]))
+
+        result = CONNECT_TO_EXT(graph, 0, [1, 2])
+
+        self.assertEqual(result.row(0), ([3], [7], 7))
+        self.assertEqual(result.row(3), ([0], [7], 7))
+
+    def test_unchanged_with_unvisited_neighbour(self):
+        graph = as_diffusion_graph(EXAMPLE_MATRIX)
+        self.assertIs(CONNECT_TO_EXT(graph, 0, [1]), graph)
+        self.assertIs(CONNECT_TO_EXT(graph, 0, [0]), graph)
+
+    def test_in_place(self):
+        graph = as_diffusion_graph(EXAMPLE_MATRIX)
+
+        result = CONNECT_TO_EXT(graph, 0, [1, 2], in_place=True)
+
+        self.assertIs(result, graph)
+        self.assertEqual(graph.neighbours(0), [3])
+        self.assertEqual(graph.neighbours(1), [])
+
+    def test_matches_dense_removal(self):
+        # Same steps as the R function on a dense matrix, keeping rows and columns of removed nodes as zeros
+        matrix = pd.read_csv(f"{data_folder}/graph_500_nodes_0.9_probability.csv", dtype=int).to_numpy()
+        graph = as_diffusion_graph(matrix)
+        sn = 0
+        visited_nodes = [sn] + graph.neighbours(sn)[:-1]
+        visited_nodes += graph.neighbours(graph.neighbours(sn)[-1]) + [graph.neighbours(sn)[-1]]
+
+        expected = matrix.astype(float)
+        removed = [node for node in set(visited_nodes) if node != sn]
+        expected[removed, :] = 0
+        expected[:, removed] = 0
+        for node in range(len(matrix)):
+            if node not in visited_nodes and matrix[sn, node] == 0:
+                connected = [neighbour for neighbour in np.flatnonzero(matrix[sn]) if matrix[neighbour, node] > 0]
+                if len(connected) > 0:
+                    expected[sn, node] = expected[node, sn] = matrix[connected[-1], node]
+
+        np.testing.assert_array_equal(to_dense(CONNECT_TO_EXT(graph, sn, visited_nodes)), expected)
+
+    def test_matches_R(self):
+        df = pd.read_csv(f"{data_folder}/graph_50_nodes_0.25_probability.csv", dtype=int)
+        matrix = df.to_numpy()
+        graph = as_diffusion_graph(matrix)
+        generator = random.Random(0)
+        for sn in generator.sample(range(len(matrix)), 5):
+            visited_nodes = graph.neighbours(sn) + generator.sample(range(len(matrix)), 3)
+            expected = get_connect_to_ext_reference(matrix, sn, visited_nodes)
+            if expected is None:
+                self.skipTest("R is not available")
+            with self.subTest(sn=sn):
+                np.testing.assert_array_equal(to_dense(CONNECT_TO_EXT(graph, sn, visited_nodes)), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
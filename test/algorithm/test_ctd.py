@@ -15,21 +15,14 @@ import tracemalloc
 
 from src.util.draw import *
 from src.algorithm.ctd import *
+from src.algorithm.graph import *
 from src.util.console import *
+from src.util.generate import geometric_graph
+from src.util.graph_io import write_csv_graph
 from src.util.path import *
 
-# Packages for R code
-import rpy2.robjects as robjects
-from rpy2.robjects.conversion import localconverter
-from rpy2.robjects import pandas2ri
-import rpy2.robjects as ro
-
-# Connect to R function
-R_files_location = get_project_root() + '/src/R'
-r = robjects.r
-r['source'](f'{R_files_location}/graph.diffuseP1.r')
-r['source'](f'{R_files_location}/graph.connectToExt.r')
-R_function = robjects.globalenv['graph.diffuseP1']
+# Results of R function, computed once and stored in test/data/reference
+from r_reference import *
 
 # Define constants
 ALLOWED_DIFFERENCE = 1e-15
@@ -46,10 +39,21 @@ data_folder = get_project_root() + "/test/data/graph"
 def check_equal(self, a, b):
     self.assertEqual(len(a), len(b), "Results do not have same number of nodes")
     for node in a:
-        self.assertLess(abs(a[node] - b[node][0]), ALLOWED_DIFFERENCE,
+        self.assertLess(abs(a[node] - b[node]), ALLOWED_DIFFERENCE,
                         f"Difference between results for node {node} is greater than {ALLOWED_DIFFERENCE}")
 
 
+def check_R_reference(self, graph_path, sn, *results):
+    # Only this comparison is reported as skipped when R is not available
+    with self.subTest(reference="R"):
+        response = get_reference(graph_path, sn, STARTING_PROBABILITY, THRESHOLD_DIFF)
+        if response is None:
+            self.skipTest("R is not available and no stored reference result was found")
+        for result in results:
+            check_equal(self, result, response)
+        write_success_message("\nPASS!")
+
+
 def generate_test_graphs():
     write_header_message("Generating test data:")
     destination_folder = get_project_root() + "/test/data/graph"
@@ -63,12 +67,10 @@ def generate_test_graphs():
                     f"Test graph \'{relative_path(destination_folder)}/graph_{node_count}_nodes_{edge_probability}_probability.csv\' already exists")
                 continue
 
-            graph = nx.random_geometric_graph(node_count, edge_probability, seed=0)
-            for (_, _, w) in graph.edges(data=True):
-                w['weight'] = random.randint(1, 20)
-
-            df = nx.to_pandas_adjacency(graph, dtype=int)
-            df.to_csv(f"{destination_folder}/graph_{node_count}_nodes_{edge_probability}_probability.csv", index=False)
+            # Same model as networkx random_geometric_graph with edge_probability as radius, built as a sparse matrix
+            matrix = geometric_graph(node_count, edge_probability, seed=0)
+            write_csv_graph(f"{destination_folder}/graph_{node_count}_nodes_{edge_probability}_probability.csv",
+                            matrix)
     write_success_message("SUCCESS - Test data generated")
 
 
@@ -114,15 +116,8 @@ class TestCTD(unittest.TestCase):
             number=NUMBER_OF_EXECUTIONS)
         print(f'Average execution time: {execution_time / NUMBER_OF_EXECUTIONS}s')
 
-        # Call R function
-        with localconverter(ro.default_converter + pandas2ri.converter):  # Convert data
-            df_r = ro.conversion.py2rpy(df)
-        # No need to convert response from R list to Python list
-        response = R_function(STARTING_PROBABILITY, sn_init + 1, THRESHOLD_DIFF, df_r)
-
         # Check if we got correct result
-        check_equal(self, probabilities, response)
-        write_success_message("\nPASS!")
+        check_R_reference(self, f"{data_folder}/graph_5_nodes.csv", sn_init, probabilities)
 
     def test_iterative_with_5_node_graph(self):
         try:
@@ -161,15 +156,8 @@ class TestCTD(unittest.TestCase):
             number=NUMBER_OF_EXECUTIONS)
         print(f'Average execution time: {execution_time / NUMBER_OF_EXECUTIONS}s')
 
-        # Call R function
-        with localconverter(ro.default_converter + pandas2ri.converter):  # Convert data
-            df_r = ro.conversion.py2rpy(df)
-        # No need to convert response from R list to Python list
-        response = R_function(STARTING_PROBABILITY, sn_init + 1, THRESHOLD_DIFF, df_r)
-
         # Check if we got correct result
-        check_equal(self, probabilities, response)
-        write_success_message("\nPASS!")
+        check_R_reference(self, f"{data_folder}/graph_5_nodes.csv", sn_init, probabilities)
 
     def test_recursive_with_10_node_graph(self):
         try:
@@ -211,15 +199,8 @@ class TestCTD(unittest.TestCase):
             number=NUMBER_OF_EXECUTIONS)
         print(f'Average execution time: {execution_time / NUMBER_OF_EXECUTIONS}s')
 
-        # Call R function
-        with localconverter(ro.default_converter + pandas2ri.converter):  # Convert data
-            df_r = ro.conversion.py2rpy(df)
-        # No need to convert response from R list to Python list
-        response = R_function(STARTING_PROBABILITY, sn_init + 1, THRESHOLD_DIFF, df_r)
-
         # Check if we got correct result
-        check_equal(self, probabilities, response)
-        write_success_message("\nPASS!")
+        check_R_reference(self, f"{data_folder}/graph_10_nodes.csv", sn_init, probabilities)
 
     def test_iterative_with_10_node_graph(self):
         try:
@@ -258,15 +239,33 @@ class TestCTD(unittest.TestCase):
             number=NUMBER_OF_EXECUTIONS)
         print(f'Average execution time: {execution_time / NUMBER_OF_EXECUTIONS}s')
 
-        # Call R function
-        with localconverter(ro.default_converter + pandas2ri.converter):  # Convert data
-            df_r = ro.conversion.py2rpy(df)
-        # No need to convert response from R list to Python list
-        response = R_function(STARTING_PROBABILITY, sn_init + 1, THRESHOLD_DIFF, df_r)
-
         # Check if we got correct result
-        check_equal(self, probabilities, response)
-        write_success_message("\nPASS!")
+        check_R_reference(self, f"{data_folder}/graph_10_nodes.csv", sn_init, probabilities)
+
+    def test_iterative_with_merged_states(self):
+        for node_count in NUMBER_OF_NODES[:2]:
+            for edge_probability in PROBABILITY:
+                with self.subTest(f"{node_count}_nodes_{edge_probability}_prob"):
+                    df = pd.read_csv(
+                        f"{data_folder}/graph_{node_count}_nodes_{edge_probability}_probability.csv",
+                        dtype=int)
+                    graph = as_diffusion_graph(df)
+
+                    for sn_init in range(node_count):
+                        probabilities = {}
+                        for i in range(node_count):
+                            probabilities[i] = 0
+                        probabilities[sn_init] = STARTING_PROBABILITY
+                        probabilities_merged = copy.deepcopy(probabilities)
+
+                        DIFFUSE_PROB_ITERATIVE(STARTING_PROBABILITY, sn_init, probabilities, graph)
+                        DIFFUSE_PROB_ITERATIVE(STARTING_PROBABILITY, sn_init, probabilities_merged, graph,
+                                               merge_states=True)
+
+                        for node in probabilities:
+                            self.assertLess(abs(probabilities[node] - probabilities_merged[node]), ALLOWED_DIFFERENCE,
+                                            f"Difference between results for node {node} is greater than "
+                                            f"{ALLOWED_DIFFERENCE}")
 
     def test_recursive_and_iterative_on_same_graphs(self, generate_test_data=True):
         if generate_test_data:
@@ -287,9 +286,11 @@ class TestCTD(unittest.TestCase):
                         continue
 
                     df.columns = df.columns.astype(int)
+                    # Convert graph before measuring memory, so that only the diffusion itself is measured
+                    graph = as_diffusion_graph(df)
 
-                    # Determine starting node
-                    sn_init = random.randrange(0, node_count)
+                    # Determine starting node, same for every run so stored R results can be reused
+                    sn_init = random.Random(f"{node_count}_{edge_probability}").randrange(0, node_count)
                     probabilities = {}
                     for i in range(node_count):
                         probabilities[i] = 0
@@ -309,10 +310,11 @@ class TestCTD(unittest.TestCase):
                     tracemalloc.start()
 
                     # Call CTD function
-                    DIFFUSE_PROB_RECURSIVE(STARTING_PROBABILITY, sn_init, probabilities, starting_set, df)
+                    DIFFUSE_PROB_RECURSIVE(STARTING_PROBABILITY, sn_init, probabilities, starting_set, graph)
 
                     first_size, first_peak = tracemalloc.get_traced_memory()
                     print(f"{first_size=}, {first_peak=}")
+                    print(f"Peak memory: {first_peak / 1024:.1f} KiB")
                     tracemalloc.stop()
 
                     recursive_response = copy.deepcopy(probabilities)
@@ -321,7 +323,7 @@ class TestCTD(unittest.TestCase):
                     execution_time = timeit.timeit(
                         lambda: DIFFUSE_PROB_RECURSIVE(STARTING_PROBABILITY, sn_init, probabilities_test,
                                                        starting_set,
-                                                       df),
+                                                       graph),
                         number=NUMBER_OF_EXECUTIONS)
                     print(f'Average execution time: {execution_time / NUMBER_OF_EXECUTIONS}s')
 
@@ -336,34 +338,32 @@ class TestCTD(unittest.TestCase):
                     tracemalloc.start()
 
                     # Call CTD function
-                    DIFFUSE_PROB_ITERATIVE(STARTING_PROBABILITY, sn_init, probabilities, df)
+                    DIFFUSE_PROB_ITERATIVE(STARTING_PROBABILITY, sn_init, probabilities, graph)
 
                     second_size, second_peak = tracemalloc.get_traced_memory()
                     print(f"{second_size=}, {second_peak=}")
+                    print(f"Peak memory: {second_peak / 1024:.1f} KiB")
                     tracemalloc.stop()
 
                     iterative_response = copy.deepcopy(probabilities)
 
                     # Calculate execution time
                     execution_time = timeit.timeit(
-                        lambda: DIFFUSE_PROB_ITERATIVE(STARTING_PROBABILITY, sn_init, probabilities_test, df),
+                        lambda: DIFFUSE_PROB_ITERATIVE(STARTING_PROBABILITY, sn_init, probabilities_test, graph),
                         number=NUMBER_OF_EXECUTIONS)
                     print(f'Average execution time: {execution_time / NUMBER_OF_EXECUTIONS}s')
 
-                    # Call R function
-                    with localconverter(ro.default_converter + pandas2ri.converter):  # Convert data
-                        df_r = ro.conversion.py2rpy(df)
-                    # No need to convert response from R list to Python list
-                    response = R_function(STARTING_PROBABILITY, sn_init + 1, THRESHOLD_DIFF, df_r)
+                    check_equal(self, recursive_response, iterative_response)
 
-                    check_equal(self, recursive_response, response)
-                    check_equal(self, iterative_response, response)
-                    write_success_message("\nPASS!")
                     # Draw
                     if node_count == NUMBER_OF_NODES[0]:
                         graph = nx.from_pandas_adjacency(df)
                         draw_graph(graph, probabilities, f"{node_count}_nodes_{edge_probability}_probability",
                                    sn_init, STARTING_PROBABILITY)
+
+                    check_R_reference(
+                        self, f"{data_folder}/graph_{node_count}_nodes_{edge_probability}_probability.csv", sn_init,
+                        recursive_response, iterative_response)
                     write_normal_message("--------------------------------------------")
 
 
@@ -0,0 +1,71 @@
+"""
+
+    Used for testing of depth-first CTD (Connect the dots) probability diffusion with an explicit stack
+
+"""
+import unittest
+
+import pandas as pd
+
+from src.algorithm.ctd import *
+from src.algorithm.graph import *
+from src.algorithm.stats import *
+from src.util.path import *
+
+STARTING_PROBABILITY = 0.5
+
+data_folder = get_project_root() + "/test/data/graph"
+
+
+class TestDepthFirst(unittest.TestCase):
+
+    def test_matches_recursive_exactly(self):
+        for name in ["graph_10_nodes.csv", "graph_10_nodes_0.9_probability.csv", "graph_50_nodes_0.5_probability.csv",
+                     "graph_500_nodes_0.25_probability.csv"]:
+            graph = as_diffusion_graph(pd.read_csv(f"{data_folder}/{name}", dtype=int))
+            for sn_init in range(0, graph.node_count, max(1, graph.node_count // 10)):
+                for threshold in [THRESHOLD_DIFF, THRESHOLD_DIFF / 10]:
+                    with self.subTest(graph=name, sn=sn_init, threshold=threshold):
+                        expected = [0] * graph.node_count
+                        expected_stats = DiffusionStats()
+                        DIFFUSE_PROB_RECURSIVE(STARTING_PROBABILITY, sn_init, expected, {sn_init}, graph,
+                                               threshold=threshold, stats=expected_stats)
+                        probabilities = [0] * graph.node_count
+                        stats = DiffusionStats()
+
+                        DIFFUSE_PROB_DEPTH_FIRST(STARTING_PROBABILITY, sn_init, probabilities, {sn_init}, graph,
+                                                 threshold=threshold, stats=stats)
+
+                        self.assertEqual(probabilities, expected)
+                        self.assertEqual(stats.expansions, expected_stats.expansions)
+                        self.assertEqual(stats.max_depth, expected_stats.max_depth)
+                        self.assertEqual(stats.pruned, expected_stats.pruned)
+
+    def test_given_visited_nodes(self):
+        graph = as_diffusion_graph(pd.read_csv(f"{data_folder}/graph_50_nodes_0.25_probability.csv", dtype=int))
+        vN = {0, 1, 2, 3}
+        expected = [0] * graph.node_count
+        DIFFUSE_PROB_RECURSIVE(STARTING_PROBABILITY, 0, expected, vN, graph)
+        probabilities = [0] * graph.node_count
+
+        DIFFUSE_PROB_DEPTH_FIRST(STARTING_PROBABILITY, 0, probabilities, vN, graph)
+
+        self.assertEqual(probabilities, expected)
+        self.assertEqual(vN, {0, 1, 2, 3})
+
+    def test_long_chain(self):
+        node_count = 30000
+        graph = as_diffusion_graph(edge_list_to_csr([(node, node + 1) for node in range(node_count - 1)]))
+        probabilities = [0] * node_count
+        stats = DiffusionStats()
+
+        DIFFUSE_PROB_DEPTH_FIRST(STARTING_PROBABILITY, 0, probabilities, {0}, graph, alpha=0.999, threshold=1e-12,
+                                 stats=stats)
+
+        # Deeper than the recursion limit allows
+        self.assertGreater(stats.max_depth, 20000)
+        self.assertAlmostEqual(sum(probabilities), STARTING_PROBABILITY)
+
+
+if __name__ == '__main__':
+    unittest.main()
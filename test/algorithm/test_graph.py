@@ -0,0 +1,90 @@
+"""
+
+    Used for testing of graph backends used by CTD (Connect the dots) algorithm
+
+"""
+import copy
+import unittest
+
+import numpy as np
+import scipy.sparse as sp
+
+from src.algorithm.ctd import *
+from src.algorithm.graph import *
+
+# Test graphs of test/data/graph
+from graph_data import *
+
+STARTING_PROBABILITY = 0.5
+
+
+def dense_to_edge_list(df):
+    matrix = df.to_numpy()
+    return [(u, v, matrix[u, v]) for u in range(len(matrix)) for v in range(u, len(matrix)) if matrix[u, v] > 0]
+
+
+class TestGraph(unittest.TestCase):
+
+    def test_backends_give_same_csr(self):
+        df = read_dataframe("graph_10_nodes.csv")
+        expected = to_csr(df).toarray()
+
+        np.testing.assert_array_equal(to_csr(sp.csr_matrix(df.to_numpy())).toarray(), expected)
+        np.testing.assert_array_equal(to_csr(df.to_numpy()).toarray(), expected)
+        np.testing.assert_array_equal(to_csr(dense_to_edge_list(df), node_count=10).toarray(), expected)
+
+    def test_nested_lists(self):
+        matrix = [[0, 2, 1, 0], [2, 0, 0, 0], [1, 0, 0, 0], [0, 0, 0, 0]]
+        np.testing.assert_array_equal(to_csr(matrix).toarray(), matrix)
+        np.testing.assert_array_equal(to_csr([(0, 1), (1, 2, 3)]).toarray(), [[0, 1, 0], [1, 0, 3], [0, 3, 0]])
+        np.testing.assert_array_equal(to_csr(iter([(0, 1, 2)])).toarray(), [[0, 2], [2, 0]])
+
+        # Square with rows of 3 values, could be a matrix or three weighted edges
+        with self.assertRaises(ValueError):
+            to_csr([[0, 2, 1], [2, 0, 0], [1, 0, 0]])
+        np.testing.assert_array_equal(to_csr(np.array([[0, 2, 1], [2, 0, 0], [1, 0, 0]])).toarray(),
+                                      [[0, 2, 1], [2, 0, 0], [1, 0, 0]])
+        with self.assertRaises(ValueError):
+            to_csr([[0, 1, 2, 3]])
+
+    def test_non_positive_weights_are_dropped(self):
+        matrix = to_csr(np.array([[0, -1, 2], [-1, 0, 0], [2, 0, 0]]))
+        self.assertEqual(matrix.nnz, 2)
+        self.assertEqual(matrix.indices.tolist(), [2, 0])
+
+    def test_diffusion_same_on_all_backends(self):
+        df = read_dataframe("graph_50_nodes_0.15_probability.csv")
+        backends = [df, sp.csr_matrix(df.to_numpy()), df.to_numpy(), dense_to_edge_list(df)]
+
+        probabilities = {node: 0 for node in range(len(df))}
+        probabilities[0] = STARTING_PROBABILITY
+
+        results = []
+        for adj_mat in backends:
+            recursive_response = copy.deepcopy(probabilities)
+            DIFFUSE_PROB_RECURSIVE(STARTING_PROBABILITY, 0, recursive_response, {0}, adj_mat)
+            iterative_response = copy.deepcopy(probabilities)
+            DIFFUSE_PROB_ITERATIVE(STARTING_PROBABILITY, 0, iterative_response, adj_mat)
+            results.append((recursive_response, iterative_response))
+
+        for result in results[1:]:
+            self.assertEqual(result, results[0])
+
+    def test_diffusion_graph_reused_across_calls(self):
+        df = read_dataframe("graph_50_nodes_0.5_probability.csv")
+        graph = as_diffusion_graph(df)
+        self.assertIs(as_diffusion_graph(graph), graph)
+        self.assertEqual(graph.degrees.tolist(), (df.to_numpy() > 0).sum(axis=1).tolist())
+
+        for sn_init in range(len(df)):
+            probabilities = {node: 0 for node in range(len(df))}
+            probabilities[sn_init] = STARTING_PROBABILITY
+
+            expected = copy.deepcopy(probabilities)
+            DIFFUSE_PROB_ITERATIVE(STARTING_PROBABILITY, sn_init, expected, df)
+            DIFFUSE_PROB_ITERATIVE(STARTING_PROBABILITY, sn_init, probabilities, graph)
+            self.assertEqual(probabilities, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+"""
+
+    Used for testing of incremental CTD (Connect the dots) probability diffusion
+
+"""
+import random
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.algorithm.batch import *
+from src.algorithm.incremental import *
+from src.util.path import *
+
+STARTING_PROBABILITY = 0.5
+
+data_folder = get_project_root() + "/test/data/graph"
+
+
+class TestIncremental(unittest.TestCase):
+
+    def test_results_match_full_recompute(self):
+        df = pd.read_csv(f"{data_folder}/graph_50_nodes_0.15_probability.csv", dtype=int)
+        matrix = df.to_numpy().copy()
+        node_count = len(matrix)
+        sources = [(sn, STARTING_PROBABILITY) for sn in range(node_count)]
+
+        diffusion = IncrementalDiffusion(df)
+        rng = random.Random(0)
+        for _ in range(5):
+            for sn, p1 in sources:
+                diffusion.diffuse(sn, p1)
+
+            # Change weights of a few edges, add one edge and remove one
+            edges = [(u, v, rng.randint(1, 20)) for u, v in zip(*np.nonzero(np.triu(matrix)))]
+            updates = rng.sample(edges, 3)
+            updates.append((rng.randrange(node_count), rng.randrange(node_count), rng.randint(1, 20)))
+            updates.append(edges[rng.randrange(len(edges))][:2] + (0,))
+            for u, v, weight in updates:
+                matrix[u, v] = weight
+                matrix[v, u] = weight
+            recomputations = diffusion.recomputations
+            diffusion.update_edges(updates)
+
+            response = np.array([diffusion.diffuse(sn, p1) for sn, p1 in sources])
+
+            np.testing.assert_array_equal(response, DIFFUSE_PROB_BATCH(sources, matrix))
+            # Only results which read a changed row were computed again
+            self.assertLess(diffusion.recomputations - recomputations, node_count)
+
+    def test_unaffected_results_are_served_from_cache(self):
+        df = pd.read_csv(f"{data_folder}/graph_10_nodes_0.15_probability.csv", dtype=int)
+        diffusion = IncrementalDiffusion(df)
+        first = diffusion.diffuse(0, STARTING_PROBABILITY)
+        # Connecting two isolated nodes does not change anything diffusion from node 0 reads
+        isolated = [node for node in range(10) if df.iloc[node].sum() == 0]
+        diffusion.set_edge(isolated[0], isolated[-1], 5)
+
+        self.assertEqual(diffusion.result_version(0, STARTING_PROBABILITY), 0)
+        np.testing.assert_array_equal(diffusion.diffuse(0, STARTING_PROBABILITY), first)
+        self.assertEqual(diffusion.hits, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
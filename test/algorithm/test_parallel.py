@@ -0,0 +1,32 @@
+"""
+
+    Used for testing of parallel CTD (Connect the dots) probability diffusion
+
+"""
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.algorithm.batch import *
+from src.algorithm.parallel import *
+from src.util.path import *
+
+STARTING_PROBABILITY = 0.5
+
+data_folder = get_project_root() + "/test/data/graph"
+
+
+class TestParallel(unittest.TestCase):
+
+    def test_parallel_matches_batch(self):
+        df = pd.read_csv(f"{data_folder}/graph_50_nodes_0.25_probability.csv", dtype=int)
+        sources = [(sn, STARTING_PROBABILITY) for sn in range(len(df))]
+
+        response = DIFFUSE_PROB_PARALLEL(sources, df, processes=2, chunk_size=7)
+
+        np.testing.assert_array_equal(response, DIFFUSE_PROB_BATCH(sources, df))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+"""
+
+    Used for testing of approximate CTD (Connect the dots) probability diffusion by residual pushes
+
+"""
+import unittest
+
+import numpy as np
+
+from src.algorithm.ctd import *
+from src.algorithm.graph import *
+from src.algorithm.push import *
+
+# Test graphs of test/data/graph
+from graph_data import *
+
+ALLOWED_DIFFERENCE = 1e-12
+STARTING_PROBABILITY = 0.5
+
+TEST_GRAPHS = ["graph_5_nodes.csv", "graph_10_nodes.csv"] + \
+              [f"graph_{node_count}_nodes_{edge_probability}_probability.csv"
+               for node_count in [10, 50] for edge_probability in [0.15, 0.25, 0.5, 0.75, 0.9]]
+
+
+class TestPush(unittest.TestCase):
+
+    def test_probability_is_kept(self):
+        graph, node_count = read_graph("graph_50_nodes_0.25_probability.csv")
+        for sn_init in range(node_count):
+            probabilities = np.zeros(node_count)
+            DIFFUSE_PROB_PUSH(STARTING_PROBABILITY, sn_init, probabilities, graph)
+
+            self.assertLess(abs(probabilities.sum() - STARTING_PROBABILITY), ALLOWED_DIFFERENCE)
+            self.assertEqual(probabilities[sn_init], 0)
+
+    def test_star_matches_iterative(self):
+        # Leaves have no neighbours other than the starting node, so no path can return
+        graph = as_diffusion_graph(edge_list_to_csr([(0, 1, 1), (0, 2, 2), (0, 3, 3)]))
+        expected = [0] * 4
+        DIFFUSE_PROB_ITERATIVE(STARTING_PROBABILITY, 0, expected, graph)
+        probabilities = [0] * 4
+
+        DIFFUSE_PROB_PUSH(STARTING_PROBABILITY, 0, probabilities, graph)
+
+        for node in range(4):
+            self.assertLess(abs(probabilities[node] - expected[node]), ALLOWED_DIFFERENCE)
+
+    def test_isolated_node_spreads_uniformly(self):
+        graph = as_diffusion_graph(edge_list_to_csr([(1, 2)], node_count=4))
+        probabilities = [0] * 4
+
+        DIFFUSE_PROB_PUSH(STARTING_PROBABILITY, 0, probabilities, graph)
+
+        self.assertEqual(probabilities, [0] + [STARTING_PROBABILITY / 3] * 3)
+
+    def test_truncation_error_shrinks_with_residual_tolerance(self):
+        # Result without cut-off, pushed until leftover residuals are negligible
+        for name in TEST_GRAPHS:
+            graph, node_count = read_graph(name)
+            for sn_init in range(min(node_count, 5)):
+                converged = np.zeros(node_count)
+                DIFFUSE_PROB_PUSH(STARTING_PROBABILITY, sn_init, converged, graph, error_tolerance=1e-12)
+                for residual_tolerance in [1e-2, 1e-3, 1e-4]:
+                    with self.subTest(graph=name, sn=sn_init, residual_tolerance=residual_tolerance):
+                        probabilities = np.zeros(node_count)
+                        DIFFUSE_PROB_PUSH(STARTING_PROBABILITY, sn_init, probabilities, graph,
+                                          residual_tolerance=residual_tolerance)
+                        self.assertLessEqual(np.abs(probabilities - converged).sum(),
+                                             2 * (node_count - 1) * residual_tolerance + 1e-12)
+
+    def test_error_tolerance(self):
+        graph, node_count = read_graph("graph_500_nodes_0.15_probability.csv")
+        converged = np.zeros(node_count)
+        DIFFUSE_PROB_PUSH(STARTING_PROBABILITY, 0, converged, graph, error_tolerance=1e-12)
+        for error_tolerance in [1e-2, 1e-4, 1e-6]:
+            with self.subTest(error_tolerance=error_tolerance):
+                probabilities = np.zeros(node_count)
+                DIFFUSE_PROB_PUSH(STARTING_PROBABILITY, 0, probabilities, graph, error_tolerance=error_tolerance)
+                self.assertLessEqual(np.abs(probabilities - converged).sum(), error_tolerance + 1e-12)
+
+    def test_accuracy_report_approaches_returning_path_error(self):
+        # Difference from exact diffusion is the difference of the converged result plus the truncation error
+        for name in TEST_GRAPHS:
+            graph, node_count = read_graph(name)
+            start_nodes = range(min(node_count, 5))
+            limit = PUSH_ACCURACY_REPORT(graph, start_nodes, STARTING_PROBABILITY, error_tolerance=1e-12)
+            for residual_tolerance in [1e-2, 1e-3, 1e-4]:
+                with self.subTest(graph=name, residual_tolerance=residual_tolerance):
+                    report = PUSH_ACCURACY_REPORT(graph, start_nodes, STARTING_PROBABILITY,
+                                                  residual_tolerance=residual_tolerance)
+                    self.assertLessEqual(abs(report["max_l1_error"] - limit["max_l1_error"]),
+                                         2 * (node_count - 1) * residual_tolerance + 1e-12)
+
+        # Example from src/algorithm/push.py, a dense graph where little probability returns
+        graph, _ = read_graph("graph_50_nodes_0.5_probability.csv")
+        errors = [PUSH_ACCURACY_REPORT(graph, range(3), STARTING_PROBABILITY,
+                                       residual_tolerance=residual_tolerance)["relative_max_l1_error"]
+                  for residual_tolerance in [1e-2, 1e-3, 1e-4]]
+        self.assertGreater(errors[0], errors[1])
+        self.assertGreater(errors[1], errors[2])
+
+if __name__ == '__main__':
+    unittest.main()
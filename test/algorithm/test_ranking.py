@@ -0,0 +1,80 @@
+"""
+
+    Used for testing of CTD (Connect the dots) node ranking
+
+"""
+import sys
+import unittest
+
+import numpy as np
+
+from src.algorithm.graph import *
+from src.algorithm.ranking import *
+
+# Test graphs of test/data/graph
+from graph_data import *
+
+
+class TestRanking(unittest.TestCase):
+
+    def test_path_graph(self):
+        graph = as_diffusion_graph(edge_list_to_csr([(0, 1), (1, 2), (2, 3)]))
+        self.assertEqual(NodeRanker(graph).rank(0), [0, 1, 2, 3])
+        self.assertEqual(NodeRanker(graph).rank(0, S=[0, 2]), [0, 1, 2])
+
+    def test_extended_neighbours(self):
+        # After drawing 1, it has no unvisited neighbour and is connected to 3 through 0. Spreading probability
+        # evenly instead would draw 2, which has the lower index.
+        graph = as_diffusion_graph(edge_list_to_csr([(0, 1, 3), (0, 3, 1), (2, 3), (3, 4)]))
+        self.assertEqual(NodeRanker(graph).rank(0, S=[3]), [0, 1, 3])
+
+    def test_num_misses(self):
+        graph = as_diffusion_graph(edge_list_to_csr([(0, 1), (1, 2), (2, 3), (3, 4)]))
+        self.assertEqual(NodeRanker(graph).rank(0, S=[0, 4], num_misses=1), [0, 1, 2])
+
+    def test_cache_matches_uncached(self):
+        graph, node_count = read_graph("graph_50_nodes_0.25_probability.csv")
+        S = list(range(0, node_count, 5))
+        expected = NodeRanker(graph, cache_size=0).rank_all(S, num_misses=5)
+
+        ranker = NodeRanker(graph)
+        self.assertEqual(ranker.rank_all(S, num_misses=5), expected)
+        computed = ranker.cache_misses
+
+        # Every state was seen before, so nothing is diffused again
+        self.assertEqual(ranker.rank_all(S, num_misses=5), expected)
+        self.assertEqual(ranker.cache_misses, computed)
+        self.assertGreater(ranker.cache_hits, 0)
+
+    def test_shared_prefix(self):
+        graph, node_count = read_graph("graph_50_nodes_0.5_probability.csv")
+        ranker = NodeRanker(graph)
+        full = ranker.rank(3, num_misses=None)
+        computed = ranker.cache_misses
+
+        self.assertEqual(ranker.rank(3, S=full[:10]), full[:10])
+        self.assertEqual(ranker.cache_misses, computed)
+
+    def test_memory_cap(self):
+        graph, node_count = read_graph("graph_50_nodes_0.25_probability.csv")
+        result_size = np.zeros(node_count).nbytes
+        ranker = NodeRanker(graph, max_memory=3 * result_size)
+        ranker.rank(0, num_misses=20)
+
+        self.assertLessEqual(len(ranker._results), 3)
+        self.assertLessEqual(ranker.memory, 3 * result_size)
+
+        # Sets of drawn nodes in the keys are counted too
+        ranker = NodeRanker(graph)
+        ranker.rank(0, num_misses=20)
+        self.assertEqual(ranker.memory, sum(sys.getsizeof(visited_nodes) + result.nbytes
+                                            for (_, visited_nodes), result in ranker._results.items()))
+        self.assertGreater(ranker.memory, len(ranker._results) * result_size)
+
+        ranker = NodeRanker(graph, cache_size=2)
+        ranker.rank(0, num_misses=20)
+        self.assertEqual(len(ranker._results), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+
+    Used for testing of NumPy result buffers of CTD (Connect the dots) probability diffusion
+
+"""
+import unittest
+
+import numpy as np
+
+from src.algorithm.batch import *
+from src.algorithm.bounded import *
+from src.algorithm.ctd import *
+from src.algorithm.graph import *
+from src.algorithm.result import *
+
+# Test graphs of test/data/graph
+from graph_data import *
+
+ALLOWED_DIFFERENCE = 1e-15
+STARTING_PROBABILITY = 0.5
+
+
+class TestResult(unittest.TestCase):
+
+    def test_array_matches_dict(self):
+        graph, node_count = read_graph("graph_50_nodes_0.25_probability.csv")
+        engines = {
+            "recursive": lambda sn, G: DIFFUSE_PROB_RECURSIVE(STARTING_PROBABILITY, sn, G, {sn}, graph),
+            "iterative": lambda sn, G: DIFFUSE_PROB_ITERATIVE(STARTING_PROBABILITY, sn, G, graph),
+            "merged": lambda sn, G: DIFFUSE_PROB_ITERATIVE(STARTING_PROBABILITY, sn, G, graph, merge_states=True),
+            "bounded": lambda sn, G: DIFFUSE_PROB_BOUNDED(STARTING_PROBABILITY, sn, G, graph),
+        }
+        for name, engine in engines.items():
+            for sn_init in range(0, node_count, 7):
+                with self.subTest(engine=name, sn=sn_init):
+                    expected = {node: 0 for node in range(node_count)}
+                    expected[sn_init] = STARTING_PROBABILITY
+                    engine(sn_init, expected)
+                    probabilities = new_probabilities(node_count, sn_init, STARTING_PROBABILITY)
+
+                    engine(sn_init, probabilities)
+
+                    for node in range(node_count):
+                        self.assertLess(abs(probabilities[node] - expected[node]), ALLOWED_DIFFERENCE)
+
+    def test_engines_return_buffer(self):
+        graph, node_count = read_graph("graph_10_nodes.csv")
+        probabilities = new_probabilities(node_count, 0, STARTING_PROBABILITY)
+        self.assertIs(DIFFUSE_PROB_ITERATIVE(STARTING_PROBABILITY, 0, probabilities, graph), probabilities)
+        self.assertIs(DIFFUSE_PROB_RECURSIVE(STARTING_PROBABILITY, 0, probabilities, {0}, graph), probabilities)
+
+    def test_float32(self):
+        graph, node_count = read_graph("graph_50_nodes_0.5_probability.csv")
+        expected = new_probabilities(node_count, 3, STARTING_PROBABILITY)
+        DIFFUSE_PROB_ITERATIVE(STARTING_PROBABILITY, 3, expected, graph)
+        probabilities = new_probabilities(node_count, 3, STARTING_PROBABILITY, dtype=np.float32)
+
+        DIFFUSE_PROB_ITERATIVE(STARTING_PROBABILITY, 3, probabilities, graph)
+
+        self.assertEqual(probabilities.dtype, np.float32)
+        np.testing.assert_array_equal(probabilities, expected.astype(np.float32))
+        batch = DIFFUSE_PROB_BATCH([(3, STARTING_PROBABILITY)], graph, dtype=np.float32)
+        np.testing.assert_array_equal(batch[0], probabilities)
+
+    def test_top_k(self):
+        G = np.array([0.1, 0.4, 0.2, 0.4, 0.0])
+
+        nodes, probabilities = top_k(G, 3)
+        np.testing.assert_array_equal(nodes, [1, 3, 2])
+        np.testing.assert_array_equal(probabilities, [0.4, 0.4, 0.2])
+
+        nodes, _ = top_k(G, 2, exclude=[1])
+        np.testing.assert_array_equal(nodes, [3, 2])
+        self.assertEqual(len(top_k(G, 10)[0]), 5)
+        self.assertEqual(len(top_k(G, 0)[0]), 0)
+
+    def test_normalize(self):
+        G = np.array([1.0, 3.0, 0.0])
+        np.testing.assert_allclose(normalize(G), [0.25, 0.75, 0])
+        np.testing.assert_array_equal(G, [1.0, 3.0, 0.0])
+        with self.assertRaises(ValueError):
+            normalize(np.zeros(3))
+
+
+if __name__ == '__main__':
+    unittest.main()
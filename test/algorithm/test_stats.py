@@ -0,0 +1,73 @@
+"""
+
+    Used for testing of statistics collected by CTD (Connect the dots) probability diffusion
+
+"""
+import unittest
+
+import pandas as pd
+
+from src.algorithm.bounded import *
+from src.algorithm.ctd import *
+from src.algorithm.graph import *
+from src.algorithm.stats import *
+from src.util.path import *
+
+STARTING_PROBABILITY = 0.5
+
+data_folder = get_project_root() + "/test/data/graph"
+
+
+class TestStats(unittest.TestCase):
+
+    def test_engines_report_same_traversal(self):
+        for name in ["graph_10_nodes.csv", "graph_50_nodes_0.15_probability.csv", "graph_50_nodes_0.9_probability.csv"]:
+            with self.subTest(name):
+                df = pd.read_csv(f"{data_folder}/{name}", dtype=int)
+                graph = as_diffusion_graph(df)
+                node_count = len(df)
+
+                recursive_stats = DiffusionStats()
+                iterative_stats = DiffusionStats()
+                for sn_init in range(node_count):
+                    probabilities = [0] * node_count
+                    DIFFUSE_PROB_RECURSIVE(STARTING_PROBABILITY, sn_init, probabilities, {sn_init}, graph,
+                                           stats=recursive_stats)
+                    probabilities_with_stats = [0] * node_count
+                    DIFFUSE_PROB_ITERATIVE(STARTING_PROBABILITY, sn_init, probabilities_with_stats, graph,
+                                           stats=iterative_stats)
+
+                    # Collecting statistics does not change the result
+                    probabilities = [0] * node_count
+                    DIFFUSE_PROB_ITERATIVE(STARTING_PROBABILITY, sn_init, probabilities, graph)
+                    self.assertEqual(probabilities, probabilities_with_stats)
+
+                expansions = sum(DIFFUSE_PROB_BOUNDED(STARTING_PROBABILITY, sn_init, [0] * node_count, graph)
+                                 .expansions for sn_init in range(node_count))
+                for stats in [recursive_stats, iterative_stats]:
+                    self.assertEqual(stats.expansions, expansions)
+                    self.assertEqual(stats.pruned, recursive_stats.pruned)
+                    self.assertEqual(stats.max_depth, recursive_stats.max_depth)
+                    self.assertEqual(stats.uniform_spreads, recursive_stats.uniform_spreads)
+                    self.assertAlmostEqual(stats.uniform_spread_probability,
+                                           recursive_stats.uniform_spread_probability, delta=1e-12)
+                    self.assertIn("graph", stats.phase_times)
+                    self.assertIn("diffusion", stats.phase_times)
+                self.assertGreaterEqual(iterative_stats.max_frontier, 1)
+
+    def test_merged_states_expand_less(self):
+        df = pd.read_csv(f"{data_folder}/graph_10_nodes_0.9_probability.csv", dtype=int)
+        iterative_stats = DiffusionStats()
+        merged_stats = DiffusionStats()
+
+        DIFFUSE_PROB_ITERATIVE(STARTING_PROBABILITY, 0, [0] * 10, df, threshold=1e-4, stats=iterative_stats)
+        DIFFUSE_PROB_ITERATIVE(STARTING_PROBABILITY, 0, [0] * 10, df, threshold=1e-4, merge_states=True,
+                               stats=merged_stats)
+
+        self.assertLess(merged_stats.expansions, iterative_stats.expansions)
+        self.assertEqual(merged_stats.pruned, iterative_stats.pruned)
+        self.assertEqual(merged_stats.max_depth, iterative_stats.max_depth)
+
+
+if __name__ == "__main__":
+    unittest.main()
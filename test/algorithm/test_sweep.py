@@ -0,0 +1,51 @@
+"""
+
+    Used for testing of CTD (Connect the dots) probability diffusion over many thresholds and alphas
+
+"""
+import unittest
+
+import pandas as pd
+
+from src.algorithm.ctd import *
+from src.algorithm.graph import *
+from src.algorithm.sweep import *
+from src.util.path import *
+
+ALLOWED_DIFFERENCE = 1e-15
+STARTING_PROBABILITY = 0.5
+
+THRESHOLDS = [0.01, 0.001, 0.05, 0.0001]
+ALPHAS = [0.5, 0.25, 0.8]
+
+data_folder = get_project_root() + "/test/data/graph"
+
+
+class TestSweep(unittest.TestCase):
+
+    def test_sweep_matches_separate_runs(self):
+        for name in ["graph_10_nodes.csv", "graph_50_nodes_0.15_probability.csv", "graph_50_nodes_0.5_probability.csv"]:
+            df = pd.read_csv(f"{data_folder}/{name}", dtype=int)
+            graph = as_diffusion_graph(df)
+            node_count = len(df)
+
+            for sn_init in [0, node_count // 2]:
+                response = DIFFUSE_PROB_SWEEP(STARTING_PROBABILITY, sn_init, graph, THRESHOLDS, ALPHAS)
+                self.assertEqual(response.shape, (len(ALPHAS), len(THRESHOLDS), node_count))
+
+                for alpha_index, alpha in enumerate(ALPHAS):
+                    for threshold_index, threshold in enumerate(THRESHOLDS):
+                        with self.subTest(f"{name} sn={sn_init} alpha={alpha} threshold={threshold}"):
+                            probabilities = {node: 0 for node in range(node_count)}
+                            probabilities[sn_init] = STARTING_PROBABILITY
+                            DIFFUSE_PROB_ITERATIVE(STARTING_PROBABILITY, sn_init, probabilities, graph, alpha,
+                                                   threshold)
+
+                            for node in probabilities:
+                                self.assertLess(
+                                    abs(response[alpha_index, threshold_index, node] - probabilities[node]),
+                                    ALLOWED_DIFFERENCE)
+
+
+if __name__ == "__main__":
+    unittest.main()
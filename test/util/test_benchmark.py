@@ -0,0 +1,73 @@
+"""
+
+    Used for testing of the benchmark runner
+
+"""
+import json
+import os.path
+import tempfile
+import unittest
+from unittest import mock
+
+from src.algorithm.graph import *
+from src.util.benchmark import *
+from src.util.graph_io import *
+from src.util.path import *
+
+data_folder = get_project_root() + "/test/data/graph"
+
+
+def result(engine, time_per_call, peak_memory, graph="graph_10_nodes"):
+    return {"graph": graph, "engine": engine, "time_per_call": time_per_call, "peak_memory": peak_memory}
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def setUp(self):
+        self.baseline = {"results": [result("iterative", 1e-3, 10 ** 6), result("push", 2e-3, 2 * 10 ** 6),
+                                     result("iterative", 7e-5, 10 ** 4, graph="graph_5_nodes")]}
+
+    def test_find_regressions(self):
+        results = [result("iterative", 1.2e-3, 10 ** 6), result("push", 2e-3, 2.6 * 10 ** 6),
+                   result("iterative", 9e-5, 2 * 10 ** 4, graph="graph_5_nodes"),
+                   result("iterative", 9.0, 9000, graph="new_graph")]
+
+        regressions = find_regressions(results, self.baseline, 0.25)
+
+        # Time within tolerance, increases below the minimum deltas and results missing from the baseline are not
+        # regressions
+        self.assertEqual(regressions, [{"graph": "graph_10_nodes", "engine": "push", "metric": "peak_memory",
+                                        "baseline": 2 * 10 ** 6, "current": 2.6 * 10 ** 6}])
+        self.assertEqual(find_regressions(results, self.baseline, 0.1)[0]["metric"], "time_per_call")
+        self.assertEqual(len(find_regressions(results, self.baseline, 0.25,
+                                              {"time_per_call": 0, "peak_memory": 0})), 3)
+
+    def test_main_exit_status(self):
+        with tempfile.TemporaryDirectory() as folder:
+            baseline_path = os.path.join(folder, "baseline.json")
+            output_path = os.path.join(folder, "results.json")
+            with open(baseline_path, "w") as file:
+                json.dump(self.baseline, file)
+            arguments = ["--output", output_path, "--baseline", baseline_path, "--large-sizes"]
+
+            with mock.patch("src.util.benchmark.run_benchmarks", return_value=[result("iterative", 1.1e-3, 10 ** 6)]):
+                self.assertEqual(main(arguments), 0)
+            with mock.patch("src.util.benchmark.run_benchmarks", return_value=[result("iterative", 2e-3, 10 ** 6)]):
+                self.assertEqual(main(arguments), 1)
+
+            with open(output_path) as file:
+                self.assertEqual(len(json.load(file)["regressions"]), 1)
+
+    def test_count_expansions(self):
+        graph = as_diffusion_graph(read_csv_graph(f"{data_folder}/graph_10_nodes.csv"))
+
+        # Recursive and iterative engines expand the same states, merging expands no more of them
+        self.assertEqual(count_expansions("recursive", graph, [0, 3]), count_expansions("iterative", graph, [0, 3]))
+        self.assertLessEqual(count_expansions("iterative_merged", graph, [0, 3]),
+                             count_expansions("iterative", graph, [0, 3]))
+        self.assertGreater(count_expansions("bounded", graph, [0, 3]), 0)
+        self.assertIsNone(count_expansions("push", graph, [0, 3]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+"""
+
+    Used for testing of graph visualization
+
+"""
+import tempfile
+import unittest
+from unittest import mock
+
+import networkx as nx
+import numpy as np
+import plotly.graph_objects as go
+
+import src.util.draw as draw
+from src.util.draw import *
+
+
+class TestDraw(unittest.TestCase):
+
+    def setUp(self):
+        # Layouts of test graphs are not kept between tests
+        self.layout_folder = tempfile.TemporaryDirectory()
+        patcher = mock.patch.multiple(draw, layout_folder=self.layout_folder.name, _layouts={})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.layout_folder.cleanup)
+
+    def test_layout_is_cached(self):
+        graph = nx.random_geometric_graph(30, 0.3, seed=1)
+        with mock.patch("networkx.spring_layout", wraps=nx.spring_layout) as spring_layout:
+            first = get_layout(graph)
+            second = get_layout(nx.Graph(graph))
+            self.assertEqual(spring_layout.call_count, 1)
+        self.assertIs(first, second)
+
+        # Layout stored on disk is used by a new process
+        draw._layouts.clear()
+        with mock.patch("networkx.spring_layout") as spring_layout:
+            np.testing.assert_array_equal(get_layout(graph), first)
+            spring_layout.assert_not_called()
+
+    def test_figure(self):
+        graph = nx.path_graph(4)
+        fig = graph_figure(graph, {0: 0.1, 1: 0.2, 2: 0.3, 3: 0.4}, 0, 0.5)
+
+        edge_trace, node_trace = fig.data
+        self.assertIsInstance(node_trace, go.Scatter)
+        self.assertEqual(list(node_trace.marker.color), [0.5, 0.2, 0.3, 0.4])
+        self.assertEqual(node_trace.text[1], "Probability: 0.2")
+        # Three edges, each as start, end and gap
+        self.assertEqual(len(edge_trace.x), 9)
+
+    def test_large_graph_mode(self):
+        graph = nx.random_geometric_graph(200, 0.2, seed=2)
+        probabilities = np.random.default_rng(0).random(200)
+
+        fig = graph_figure(graph, probabilities, 0, 1, webgl=True, top_k=50, max_edges=40)
+
+        edge_trace, node_trace = fig.data
+        self.assertIsInstance(node_trace, go.Scattergl)
+        self.assertLessEqual(len(node_trace.x), 51)
+        self.assertEqual(len(edge_trace.x), 40 * 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+"""
+
+    Used for testing of synthetic graph generation
+
+"""
+import tempfile
+import unittest
+
+import numpy as np
+
+from src.util.generate import *
+from src.util.graph_io import *
+
+
+class TestGenerate(unittest.TestCase):
+
+    def test_graphs(self):
+        for topology, mean_degree in [("geometric", 10), ("scale_free", 4), ("ppi", 7)]:
+            with self.subTest(topology=topology):
+                matrix = generate_graph(topology, 20000, seed=1)
+
+                self.assertEqual(matrix.shape, (20000, 20000))
+                self.assertEqual(abs(matrix - matrix.T).nnz, 0)
+                self.assertEqual(matrix.diagonal().sum(), 0)
+                self.assertTrue(np.all((matrix.data >= 1) & (matrix.data <= MAX_WEIGHT)))
+                self.assertAlmostEqual(matrix.nnz / 20000, mean_degree, delta=mean_degree * 0.1)
+
+    def test_seeded(self):
+        for topology in TOPOLOGIES:
+            with self.subTest(topology=topology):
+                first = generate_graph(topology, 1000, seed=5)
+                self.assertEqual((first != generate_graph(topology, 1000, seed=5)).nnz, 0)
+                self.assertNotEqual((first != generate_graph(topology, 1000, seed=6)).nnz, 0)
+
+    def test_scale_free_has_hubs(self):
+        degrees = np.diff(generate_graph("scale_free", 20000).indptr)
+        self.assertGreater(degrees.max(), 20 * degrees.mean())
+
+    def test_generate_graphs(self):
+        with tempfile.TemporaryDirectory() as folder:
+            specifications = [("geometric", 500, 0), ("ppi", 800, 1)]
+            paths = generate_graphs(specifications, folder, processes=2)
+
+            for (topology, node_count, seed), path in zip(specifications, paths):
+                graph = load_graph(path)
+                indptr, indices, weights = graph.csr_arrays()
+                expected = generate_graph(topology, node_count, seed)
+                np.testing.assert_array_equal(indptr, expected.indptr)
+                np.testing.assert_array_equal(indices, expected.indices)
+                np.testing.assert_array_equal(weights, expected.data)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+"""
+
+    Used for testing of binary graph format
+
+"""
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.algorithm.ctd import *
+from src.algorithm.graph import *
+from src.util.graph_io import *
+from src.util.path import *
+
+STARTING_PROBABILITY = 0.5
+
+data_folder = get_project_root() + "/test/data/graph"
+
+
+class TestGraphIO(unittest.TestCase):
+
+    def test_converted_graph_matches_csv(self):
+        with tempfile.TemporaryDirectory() as folder:
+            for name in ["graph_5_nodes", "graph_50_nodes_0.5_probability", "graph_500_nodes_0.15_probability"]:
+                with self.subTest(name):
+                    df = pd.read_csv(f"{data_folder}/{name}.csv", dtype=int)
+                    graph_path = convert_csv_graph(f"{data_folder}/{name}.csv", f"{folder}/{name}{GRAPH_EXTENSION}")
+
+                    graph = load_graph(graph_path)
+                    expected = to_csr(df)
+
+                    self.assertIsInstance(graph.indptr, np.memmap)
+                    self.assertIsInstance(graph.indices, np.memmap)
+                    np.testing.assert_array_equal(graph.indptr, expected.indptr)
+                    np.testing.assert_array_equal(graph.indices, expected.indices)
+                    np.testing.assert_array_equal(graph.weights, expected.data)
+
+                    probabilities = {node: 0 for node in range(len(df))}
+                    probabilities[0] = STARTING_PROBABILITY
+                    expected_probabilities = dict(probabilities)
+                    DIFFUSE_PROB_ITERATIVE(STARTING_PROBABILITY, 0, probabilities, graph)
+                    DIFFUSE_PROB_ITERATIVE(STARTING_PROBABILITY, 0, expected_probabilities, df)
+                    self.assertEqual(probabilities, expected_probabilities)
+
+    def test_streaming_reader_matches_dataframe(self):
+        for name in ["graph_10_nodes", "graph_50_nodes_0.25_probability", "graph_500_nodes_0.9_probability"]:
+            with self.subTest(name):
+                expected = to_csr(pd.read_csv(f"{data_folder}/{name}.csv", dtype=int))
+                # Chunks of a few rows, so rows of the result come from many chunks
+                matrix = read_csv_graph(f"{data_folder}/{name}.csv", chunk_bytes=3 * 8 * expected.shape[0])
+
+                np.testing.assert_array_equal(matrix.indptr, expected.indptr)
+                np.testing.assert_array_equal(matrix.indices, expected.indices)
+                np.testing.assert_array_equal(matrix.data, expected.data)
+
+    def test_written_csv_matches_dataframe(self):
+        with tempfile.TemporaryDirectory() as folder:
+            for name in ["graph_5_nodes", "graph_50_nodes_0.75_probability"]:
+                with self.subTest(name):
+                    df = pd.read_csv(f"{data_folder}/{name}.csv", dtype=int)
+                    write_csv_graph(f"{folder}/{name}.csv", to_csr(df))
+
+                    written = pd.read_csv(f"{folder}/{name}.csv", dtype=int)
+                    self.assertEqual(list(written.columns), [str(node) for node in range(len(df))])
+                    np.testing.assert_array_equal(written.to_numpy(), df.to_numpy())
+
+    def test_graph_without_edges(self):
+        with tempfile.TemporaryDirectory() as folder:
+            write_graph(f"{folder}/empty{GRAPH_EXTENSION}", np.zeros((3, 3), dtype=int))
+            graph = load_graph(f"{folder}/empty{GRAPH_EXTENSION}")
+            self.assertEqual(graph.node_count, 3)
+            self.assertEqual(graph.row(1), ([], [], 0))
+
+    def test_rejects_other_files(self):
+        with self.assertRaises(ValueError):
+            load_graph(f"{data_folder}/graph_5_nodes.csv")
+
+
+if __name__ == "__main__":
+    unittest.main()
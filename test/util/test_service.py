@@ -0,0 +1,117 @@
+"""
+
+    Used for testing of the diffusion service
+
+"""
+import asyncio
+import os.path
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src.algorithm.batch import *
+from src.algorithm.graph import *
+from src.util.path import *
+from src.util.service import *
+
+STARTING_PROBABILITY = 0.5
+
+data_folder = get_project_root() + "/test/data/graph"
+
+
+class TestService(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self.folder.cleanup)
+        self.socket_path = os.path.join(self.folder.name, "diffusion.sock")
+        self.graph = as_diffusion_graph(read_csv_graph(f"{data_folder}/graph_50_nodes_0.25_probability.csv"))
+        self.server = DiffusionServer({"test": self.graph}, batch_delay=0.2, max_request_size=4096)
+
+        # Server runs in its own event loop in a background thread
+        loop = asyncio.new_event_loop()
+        started = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(loop)
+            loop.run_until_complete(self.server.start(self.socket_path))
+            started.set()
+            loop.run_forever()
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        started.wait()
+
+        async def shutdown():
+            self.server.close()
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        def stop():
+            asyncio.run_coroutine_threadsafe(shutdown(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+        self.addCleanup(stop)
+
+    def test_diffuse(self):
+        sources = [(0, STARTING_PROBABILITY), (7, 1)]
+        expected = DIFFUSE_PROB_BATCH(sources, self.graph)
+        with DiffusionClient(self.socket_path) as client:
+            self.assertEqual(client.graphs(), {"test": 50})
+            np.testing.assert_array_equal(client.diffuse("test", sources), expected)
+            np.testing.assert_array_equal(client.diffuse("test", sources, dtype="float32"),
+                                          expected.astype(np.float32))
+
+            (nodes, probabilities), _ = client.top_k("test", sources, 3)
+            self.assertEqual(len(nodes), 3)
+            np.testing.assert_array_equal(probabilities, np.sort(expected[0])[::-1][:3])
+
+    def test_concurrent_requests_are_batched(self):
+        def request(sn):
+            with DiffusionClient(self.socket_path) as client:
+                return client.diffuse("test", [(sn, STARTING_PROBABILITY)])
+
+        with ThreadPoolExecutor(4) as executor:
+            results = list(executor.map(request, range(4)))
+
+        self.assertLess(self.server.batches, 4)
+        for sn, result in enumerate(results):
+            np.testing.assert_array_equal(result, DIFFUSE_PROB_BATCH([(sn, STARTING_PROBABILITY)], self.graph))
+
+    def test_errors(self):
+        with DiffusionClient(self.socket_path) as client:
+            with self.assertRaises(DiffusionServiceError):
+                client.diffuse("missing", [(0, STARTING_PROBABILITY)])
+            with self.assertRaises(DiffusionServiceError):
+                client.diffuse("test", [(50, STARTING_PROBABILITY)])
+            # Connection is still usable after an error
+            self.assertEqual(client.load_graph("other", f"{data_folder}/graph_10_nodes.csv"), 10)
+
+    def test_request_too_long(self):
+        with DiffusionClient(self.socket_path) as client:
+            with self.assertRaisesRegex(DiffusionServiceError, "longer than 4096 bytes"):
+                client.diffuse("test", [(0, STARTING_PROBABILITY)] * 2000)
+            # Rest of the long line is skipped, next request is read normally
+            self.assertEqual(client.graphs(), {"test": 50})
+
+    def test_full_batch_cancels_timer(self):
+        server = DiffusionServer({"test": self.graph}, batch_delay=60, max_batch_size=2)
+
+        async def diffuse():
+            result = await asyncio.wait_for(server.diffuse("test", [(0, STARTING_PROBABILITY), (7, 1)]), 5)
+            self.assertEqual(server._timers, {})
+            return result
+
+        np.testing.assert_array_equal(asyncio.run(diffuse()),
+                                      DIFFUSE_PROB_BATCH([(0, STARTING_PROBABILITY), (7, 1)], self.graph))
+
+
+if __name__ == '__main__':
+    unittest.main()